@@ -6,6 +6,8 @@ from tbot_tradingboat.utils.pytest_util_crud import (
     update_tvmsg,
     send_single_webhook,
     send_webhook,
+    get_session,
+    close_session,
     open_db,
     find_specified_order,
     find_specified_order_by_type,
@@ -29,6 +31,8 @@ __all__ = [
     "update_tvmsg",
     "send_webhook",
     "send_single_webhook",
+    "get_session",
+    "close_session",
     "open_db",
     "find_portfolio_info",
     "find_specified_order",
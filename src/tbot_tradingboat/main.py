@@ -127,14 +127,16 @@ class TbotSubject:
             self.event_loop_ms = (perf_counter() - time_s) * 1e3
             if self.profiler:
                 if abs(np.random.normal(0.0, 3, 1)) > 9:
-                    logger.debug(f"loop-time: {self.event_loop_ms:.2f}ms")
-            logger.trace(f"loop-time: {self.event_loop_ms:.2f}ms")
+                    logger.debug("loop-time: {:.2f}ms", self.event_loop_ms)
+            logger.trace("loop-time: {:.2f}ms", self.event_loop_ms)
         logger.debug("handle_e: finished")
         self.close()
 
     def close(self):
         """Closes observers"""
-        for observer in self._observers:
+        # Reverse order: the messaging apps release their sqlite3 connections
+        # before the decoder checkpoints and moves the database file
+        for observer in reversed(self._observers):
             observer.close()
         if self.redis:
             self.redis.close()
@@ -3,7 +3,7 @@
 TradingBoat © Copyright, Plusgenie Limited 2023. All Rights Reserved.
 """
 import sqlite3
-from typing import List, Dict
+from typing import List, Dict, Iterable, Tuple
 
 import pandas as pd
 from loguru import logger
@@ -21,6 +21,24 @@ class TbotAlertDB(TbotDatabase):
     Define database for TradingView Webhook (Alerts)
     """
 
+    SQL_INSERT = """
+        INSERT INTO TBOTALERTS (
+            uniquekey,
+            tv_timestamp,
+            ticker,
+            direction,
+            timeframe,
+            qty,
+            orderref,
+            alertstatus,
+            entrylimit,
+            entrystop,
+            exitlimit,
+            exitstop,
+            tv_price
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """
+
     def __init__(self):
         self.conn = None
         self.cursor = None
@@ -28,7 +46,7 @@ class TbotAlertDB(TbotDatabase):
         self.host = None
         self.port = None
 
-    def setup_connection(self, db_path, host=None, port=None):
+    def setup_connection(self, db_path, host=None, port=None, conn=None):
         """
         Connect to sqlite3
 
@@ -36,19 +54,18 @@ class TbotAlertDB(TbotDatabase):
             db_path (str): the path to sqlite3 socket
             host (str): the hostname of the remote SQLite server
             port (int): the port number of the remote SQLite server
+            conn (sqlite3.Connection): the existing connection to share
         """
         try:
+            self.open_connection(db_path, host, port, conn)
             if host and port:
-                self.conn = sqlite3.connect(f"sqlite://{host}:{port}/{db_path}")
                 self.host = host
                 self.port = port
-            else:
-                self.conn = sqlite3.connect(db_path)
             self.cursor = self.conn.cursor()
 
             # Retrieve the page size of the database in bytes
             page_size_query = "PRAGMA page_size;"
-            page_size = self.conn.execute(page_size_query).fetchone()[0]
+            page_size = self._exec(page_size_query)[0]["page_size"]
 
             # Set the cache size to 32MB (in bytes)
             cache_size = 32 * 1024 * 1024
@@ -90,29 +107,11 @@ class TbotAlertDB(TbotDatabase):
         self.create_trigger("TBOTALERTS", "uniquekey")
         logger.success("Connected to Alert Database sqlit3")
 
-    def insert(self, unique_ts: str, obj: AlertDBInfo):
-        sql_query = """
-            INSERT INTO TBOTALERTS (
-                uniquekey,
-                tv_timestamp,
-                ticker,
-                direction,
-                timeframe,
-                qty,
-                orderref,
-                alertstatus,
-                entrylimit,
-                entrystop,
-                exitlimit,
-                exitstop,
-                tv_price
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """
-        uniq_t = get_timestamp(unique_ts)
-        tv_t = get_timestamp(obj.timestamp)
-        sql_data = (
-            uniq_t,
-            tv_t,
+    def _to_row(self, unique_ts: str, obj: AlertDBInfo) -> Tuple:
+        """Converts the alert into the parameters of SQL_INSERT"""
+        return (
+            get_timestamp(unique_ts),
+            get_timestamp(obj.timestamp),
             obj.ticker,
             obj.direction,
             obj.timeframe,
@@ -125,7 +124,15 @@ class TbotAlertDB(TbotDatabase):
             obj.exitStop,
             obj.tv_price,
         )
-        self._exec(sql_query, sql_data)
+
+    def insert(self, unique_ts: str, obj: AlertDBInfo):
+        self._exec(self.SQL_INSERT, self._to_row(unique_ts, obj))
+
+    def insert_many(self, alerts: Iterable[Tuple[str, AlertDBInfo]]):
+        """Inserts (unique_ts, AlertDBInfo) pairs in a single transaction"""
+        rows = [self._to_row(unique_ts, obj) for unique_ts, obj in alerts]
+        if rows:
+            self._exec_many(self.SQL_INSERT, rows)
 
     def find_specified_orders(self, key: OrderKey, num: int) -> List[Dict]:
         """
@@ -24,7 +24,7 @@ class TbotErrorDB(TbotDatabase):
         self.host = None
         self.port = None
 
-    def setup_connection(self, db_path: str, host=None, port=None):
+    def setup_connection(self, db_path: str, host=None, port=None, conn=None):
         """
         Connect to sqlite3
 
@@ -32,14 +32,13 @@ class TbotErrorDB(TbotDatabase):
             db_path (str): the path to sqlite3 socket
             host (str): the hostname of the remote SQLite server
             port (int): the port number of the remote SQLite server
+            conn (sqlite3.Connection): the existing connection to share
         """
         try:
+            self.open_connection(db_path, host, port, conn)
             if host and port:
-                self.conn = sqlite3.connect(f"sqlite://{host}:{port}/{db_path}")
                 self.host = host
                 self.port = port
-            else:
-                self.conn = sqlite3.connect(db_path)
             self.cursor = self.conn.cursor()
         except sqlite3.Error as err:
             logger.error(f"{err}: {db_path}")
@@ -4,7 +4,6 @@ TradingBoat © Copyright, Plusgenie Limited 2023. All Rights Reserved.
 """
 import sys
 import traceback
-import time
 from typing import List, Dict
 
 import sqlite3
@@ -15,6 +14,7 @@ from ib_insync import (
     OrderStatus,
 )
 
+from tbot_tradingboat.utils.tbot_utils import now_ms
 from tbot_tradingboat.utils.objects import (
     OrderDBInfo,
     OrderKey,
@@ -46,7 +46,7 @@ class TbotOrderDB(TbotDatabase):
         self.host = None
         self.port = None
 
-    def setup_connection(self, db_path: str, host=None, port=None):
+    def setup_connection(self, db_path: str, host=None, port=None, conn=None):
         """
         Connect to sqlite3
 
@@ -54,14 +54,13 @@ class TbotOrderDB(TbotDatabase):
             db_path (str): the path to sqlite3 socket
             host (str): the hostname of the remote SQLite server
             port (int): the port number of the remote SQLite server
+            conn (sqlite3.Connection): the existing connection to share
         """
         try:
+            self.open_connection(db_path, host, port, conn)
             if host and port:
-                self.conn = sqlite3.connect(f"sqlite://{host}:{port}/{db_path}")
                 self.host = host
                 self.port = port
-            else:
-                self.conn = sqlite3.connect(db_path)
 
             # Set cache size to 10,000 pages: 40 Mbytes
             self.conn.execute("PRAGMA cache_size = 10000")
@@ -409,6 +408,23 @@ class TbotOrderDB(TbotDatabase):
         logger.debug(f"{unique_key} (UTC) -> {timestamp}: {rows}")
         return rows[0] if rows else {}
 
+    def find_orders_by_unique_keys(self, unique_keys: List[str]) -> List[Dict]:
+        """
+        Batch version of find_order_by_unique_key() for a list of unique keys.
+
+        Returns one order per unique key found, in the order of unique_keys.
+        """
+        if not unique_keys:
+            return []
+        timestamps = [get_timestamp(key) for key in unique_keys]
+        placeholders = ",".join("?" * len(timestamps))
+        sql_query = f"SELECT * FROM TBOTORDERS WHERE uniquekey IN ({placeholders})"
+        rows = self._exec(sql_query, timestamps)
+        by_key = {}
+        for row in rows:
+            by_key.setdefault(row["uniquekey"], row)
+        return [by_key[ts] for ts in timestamps if ts in by_key]
+
     def find_order_by_ord_id(self, ord_id: int) -> Dict:
         """
         Find an order by orderId
@@ -532,7 +548,7 @@ class TbotOrderDB(TbotDatabase):
         """Delete stale portfolio older than threshold_ms"""
         # Calculate the unique timestamp by subtracting the threshold
         # from the current time (in milliseconds)
-        unique_ts = str((time.time_ns() // 1000000) - TBOT_PORTFOLIO_THRESHOLD_MS)
+        unique_ts = str(now_ms() - TBOT_PORTFOLIO_THRESHOLD_MS)
         timestamp = get_timestamp(unique_ts)
         sql_query = "DELETE from TBOTORDERS WHERE orderstatus = ? and uniquekey < ? "
         sql_data = (TBOT_PORTFOLIO_ORDERSTATUS, timestamp)
@@ -9,6 +9,45 @@ import sqlite3
 from loguru import logger
 
 
+def open_sqlite3(db_path: str, host=None, port=None) -> sqlite3.Connection:
+    """
+    Open a connection to sqlite3 configured for the write-heavy workload of TBOT
+
+    WAL lets the observers read the database while the decoder writes it.
+    """
+    if host and port:
+        conn = sqlite3.connect(f"sqlite://{host}:{port}/{db_path}")
+    else:
+        conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    return conn
+
+
+def close_sqlite3(conn: sqlite3.Connection) -> bool:
+    """
+    Commit and close the connection opened by open_sqlite3()
+
+    Returns True if the WAL was fully folded into the main file.
+    """
+    conn.commit()
+    checkpointed = False
+    try:
+        # Fold WAL into the main file since the file is moved after closing
+        cursor = conn.cursor()
+        cursor.row_factory = None
+        # The checkpoint does not raise when blocked, it reports busy=1 instead
+        busy, _, _ = cursor.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+        checkpointed = busy == 0
+        if not checkpointed:
+            logger.warning("sqlite3: wal_checkpoint is blocked by another connection")
+    except sqlite3.Error as err:
+        logger.debug(f"sqlite3: skipping wal_checkpoint: {err}")
+    conn.close()
+    return checkpointed
+
+
 class TbotDatabase(ABC):
     """
     Base class for Sqlite3 database for Tbot
@@ -17,17 +56,29 @@ class TbotDatabase(ABC):
     def __init__(self, conn=None, cursor=None):
         self.conn = conn
         self.cursor = cursor
+        # False if the connection is shared by the caller of setup_connection()
+        self.owns_conn = True
 
     @abstractmethod
-    def setup_connection(self, db_path: str, host=None, port=None):
+    def setup_connection(self, db_path: str, host=None, port=None, conn=None):
         """Connect to sqlite3
 
         Args:
             db_path (str): the path to sqlite3 socket
             host (str): the hostname of the remote SQLite server
             port (int): the port number of the remote SQLite server
+            conn (sqlite3.Connection): the existing connection to share
         """
 
+    def open_connection(self, db_path: str, host=None, port=None, conn=None):
+        """Opens a new connection, or adopts the connection given by the caller"""
+        if conn:
+            self.conn = conn
+            self.owns_conn = False
+        else:
+            self.conn = open_sqlite3(db_path, host, port)
+            self.owns_conn = True
+
     # Define a custom row factory that returns a dictionary for each row
     def dict_factory(self, cursor, row):
         """Define Custom row factory"""
@@ -55,6 +106,17 @@ class TbotDatabase(ABC):
             raise
         return res
 
+    def _exec_many(self, sql_query, seq_of_data) -> None:
+        if not self.conn:
+            logger.error("Connection error: No connection available.")
+            return
+        try:
+            with self.conn:
+                self.conn.executemany(sql_query, seq_of_data)
+        except sqlite3.Error as err:
+            logger.error(f"{err}: {sql_query}")
+            raise
+
     def create_trigger(
         self, table_name: str, key: str, max_records: int = 3600
     ) -> bool:
@@ -95,7 +157,9 @@ class TbotDatabase(ABC):
     def close(self):
         """Close connection to sqlite3"""
         if self.conn:
-            self.conn.commit()
             if self.cursor:
                 self.cursor.close()
-            self.conn.close()
+            if self.owns_conn:
+                close_sqlite3(self.conn)
+            else:
+                self.conn.commit()
@@ -7,6 +7,7 @@ from functools import wraps
 from ib_insync import Contract
 from loguru import logger
 from tbot_tradingboat.utils.tbot_env import shared
+from tbot_tradingboat.utils.tbot_utils import strtobool
 
 TBOT_ORDERREF_MAX_LEN = 20
 TBOT_ORDERREF_PREFIX = "C"
@@ -25,11 +26,17 @@ TBOT_PORTFOLIO_THRESHOLD_MS = 4 * 60 * 60 * 1000
 # it may be better to use a unique orderRef in TradingView's webhook.
 TBOT_STRATEGY_CLOSE_ORDERDB_LOOPBACK = 1
 
+# The enter/exit traces of @mark are only visible at TRACE level or when profiling
+TBOT_MARK_ENABLED = strtobool(shared.profiler) or shared.loglevel.upper() == "TRACE"
+
 
 def mark(func):
     """
     Prints enter/exit messages for functions.
+    Returns the function itself when the messages cannot be seen.
     """
+    if not TBOT_MARK_ENABLED:
+        return func
 
     @wraps(func)
     def wrapper(*args, **kwargs):
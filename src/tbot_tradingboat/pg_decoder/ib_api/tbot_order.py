@@ -91,6 +91,10 @@ class TbotOrder(ABC):
             logger.error(f"Error requesting PnL Single for {symbol}: {err}")
             raise
 
+    def _alloc_ids(self, num: int) -> List[int]:
+        """Allocates a contiguous block of order IDs for parent/child orders"""
+        return [self.ibsyn.client.getReqId() for _ in range(num)]
+
     def create_error_order_info(self, d_ord: ErrorDBInfo):
         """Saves Order into the database"""
         self.errordb.insert("", d_ord)
@@ -171,14 +175,13 @@ class TbotOrder(ABC):
             return -1, None, ErrorStates.ENOMKTPOSDB
 
         positions = self.ibsyn.positions()
-        filtered_positions = [
-            p for p in positions if t_ord.symbol == get_ticker(p.contract)
-        ]
-        if not filtered_positions:
+        position = next(
+            (p for p in positions if t_ord.symbol == get_ticker(p.contract)), None
+        )
+        if position is None:
             logger.warning(f"Failed to find {t_ord.symbol} in {positions}")
             return -1, None, ErrorStates.ENOCLSPOS
 
-        position = filtered_positions[0]
         total = abs(position.position)
         action = "SELL" if position.position > 0 else "BUY"
         rv_qty = total if t_ord.qty == TBOT_ALL_CONTRACTS_NUM else min(t_ord.qty, total)
@@ -610,7 +613,7 @@ class TbotOrder(ABC):
         contract = self._get_contract(t_ord)
         if not contract:
             return ErrorStates.ENOCNTR
-        p_ord_id = self.ibsyn.client.getReqId()
+        p_ord_id, tp_ord_id = self._alloc_ids(2)
         exit_limit = self.mktrules.increase_price(contract, t_ord.exitLimit)[0]
         rev_act = "BUY" if t_ord.action == "SELL" else "SELL"
         parent = MarketOrder(
@@ -626,7 +629,7 @@ class TbotOrder(ABC):
             t_ord.qty,
             exit_limit,
             parentId=p_ord_id,
-            orderId=self.ibsyn.client.getReqId(),
+            orderId=tp_ord_id,
             tif=t_ord.tif,
             orderRef=t_ord.orderRef,
             transmit=True,
@@ -666,7 +669,7 @@ class TbotOrder(ABC):
         contract = self._get_contract(t_ord)
         if not contract:
             return ErrorStates.ENOCNTR
-        p_ord_id = self.ibsyn.client.getReqId()
+        p_ord_id, tp_ord_id = self._alloc_ids(2)
         entry_limit, exit_limit = self.mktrules.increase_price(
             contract, t_ord.entryLimit, t_ord.exitLimit
         )
@@ -685,7 +688,7 @@ class TbotOrder(ABC):
             t_ord.qty,
             exit_limit,
             parentId=p_ord_id,
-            orderId=self.ibsyn.client.getReqId(),
+            orderId=tp_ord_id,
             tif=t_ord.tif,
             orderRef=t_ord.orderRef,
             transmit=True,
@@ -725,7 +728,7 @@ class TbotOrder(ABC):
         contract = self._get_contract(t_ord)
         if not contract:
             return ErrorStates.ENOCNTR
-        p_ord_id = self.ibsyn.client.getReqId()
+        p_ord_id, sl_ord_id = self._alloc_ids(2)
         exit_stop = self.mktrules.increase_price(contract, t_ord.exitStop)[0]
         rev_act = "BUY" if t_ord.action == "SELL" else "SELL"
         parent = MarketOrder(
@@ -741,7 +744,7 @@ class TbotOrder(ABC):
             t_ord.qty,
             exit_stop,
             parentId=p_ord_id,
-            orderId=self.ibsyn.client.getReqId(),
+            orderId=sl_ord_id,
             tif=t_ord.tif,
             orderRef=t_ord.orderRef,
             transmit=True,
@@ -782,7 +785,7 @@ class TbotOrder(ABC):
         contract = self._get_contract(t_ord)
         if not contract:
             return ErrorStates.ENOCNTR
-        p_ord_id = self.ibsyn.client.getReqId()
+        p_ord_id, sl_ord_id = self._alloc_ids(2)
         entry_limit, exit_stop = self.mktrules.increase_price(
             contract, t_ord.entryLimit, t_ord.exitStop
         )
@@ -801,7 +804,7 @@ class TbotOrder(ABC):
             t_ord.qty,
             exit_stop,
             parentId=p_ord_id,
-            orderId=self.ibsyn.client.getReqId(),
+            orderId=sl_ord_id,
             tif=t_ord.tif,
             orderRef=t_ord.orderRef,
             transmit=True,
@@ -844,7 +847,7 @@ class TbotOrder(ABC):
         contract = self._get_contract(t_ord)
         if not contract:
             return ErrorStates.ENOCNTR
-        p_ord_id = self.ibsyn.client.getReqId()
+        p_ord_id, tp_ord_id, sl_ord_id = self._alloc_ids(3)
         exit_limit, exit_stop = self.mktrules.increase_price(
             contract, t_ord.exitLimit, t_ord.exitStop
         )
@@ -862,7 +865,7 @@ class TbotOrder(ABC):
             t_ord.qty,
             exit_limit,
             parentId=p_ord_id,
-            orderId=self.ibsyn.client.getReqId(),
+            orderId=tp_ord_id,
             tif=t_ord.tif,
             orderRef=t_ord.orderRef,
             transmit=False,
@@ -872,7 +875,7 @@ class TbotOrder(ABC):
             t_ord.qty,
             exit_stop,
             parentId=p_ord_id,
-            orderId=self.ibsyn.client.getReqId(),
+            orderId=sl_ord_id,
             tif=t_ord.tif,
             orderRef=t_ord.orderRef,
             transmit=True,
@@ -920,7 +923,7 @@ class TbotOrder(ABC):
         entry_stop, exit_limit, exit_stop = self.mktrules.increase_price(
             contract, t_ord.entryStop, t_ord.exitLimit, t_ord.exitStop
         )
-        p_ord_id = self.ibsyn.client.getReqId()
+        p_ord_id, tp_ord_id, sl_ord_id = self._alloc_ids(3)
         rev_act = "BUY" if t_ord.action == "SELL" else "SELL"
         parent = StopOrder(
             t_ord.action,
@@ -936,7 +939,7 @@ class TbotOrder(ABC):
             t_ord.qty,
             exit_limit,
             parentId=p_ord_id,
-            orderId=self.ibsyn.client.getReqId(),
+            orderId=tp_ord_id,
             tif=t_ord.tif,
             orderRef=t_ord.orderRef,
             transmit=False,
@@ -946,7 +949,7 @@ class TbotOrder(ABC):
             t_ord.qty,
             exit_stop,
             parentId=p_ord_id,
-            orderId=self.ibsyn.client.getReqId(),
+            orderId=sl_ord_id,
             tif=t_ord.tif,
             orderRef=t_ord.orderRef,
             transmit=True,
@@ -2,7 +2,7 @@
 """
 TradingBoat © Copyright, Plusgenie Limited 2023. All Rights Reserved.
 """
-import time
+import dataclasses
 from abc import ABC
 from typing import List
 import random
@@ -20,6 +20,7 @@ from ib_insync import (
 from loguru import logger
 from tbot_tradingboat.pg_database.orderdb import TbotOrderDB
 from tbot_tradingboat.pg_database.errordb import TbotErrorDB
+from tbot_tradingboat.utils.tbot_utils import now_ms
 from tbot_tradingboat.utils.objects import (
     OrderDBInfo,
     OrderKeyEx,
@@ -33,6 +34,19 @@ from tbot_tradingboat.pg_decoder.ib_api.tbot_api import (
 )
 
 
+def _zero_pair(order):
+    """Default (lmtPrice, auxPrice) for order types without prices"""
+    return 0.0, 0.0
+
+
+# Maps orderType to (lmtPrice, auxPrice) for the order status updates
+_PRICE_DISPATCH = {
+    "LMT": lambda order: (order.lmtPrice, 0.0),
+    "STP": lambda order: (0.0, order.auxPrice),
+    "STP LMT": lambda order: (order.lmtPrice, order.auxPrice),
+}
+
+
 def on_disconnected_event():
     """Handle disconnected Event"""
     logger.debug("on_disconnected_event: disconnected")
@@ -61,19 +75,19 @@ class TbotOrderEvent(ABC):
 
     def on_pending_tickers_event(self, tickers):
         """Handle onPendingTickersEvent from ib_insync"""
-        logger.debug(f"onPendingTickersEvent: {tickers}")
+        logger.debug("onPendingTickersEvent: {}", tickers)
         for tick in tickers:
             bid = tick.bid if not util.isNan(tick.bid) else 0
             ask = tick.ask if not util.isNan(tick.ask) else 0
             last = tick.last if not util.isNan(tick.last) else tick.markPrice
-            logger.debug(f"conid: {tick.contract.conId}|{bid},{ask},{last}")
+            logger.debug("conid: {}|{},{},{}", tick.contract.conId, bid, ask, last)
 
     def on_update_portfolio(self, item: PortfolioItem):
         """
         Add Portfolio into OrderDB
         The function uses fields of OrderDB slightly differently compared to real Orders
         """
-        logger.debug(f"updatePortfolioEvent: {item}")
+        logger.debug("updatePortfolioEvent: {}", item)
         symbol = get_ticker(item.contract)
         tv_price = item.marketPrice
         # Fill fields with Portfolio specifc information
@@ -90,7 +104,7 @@ class TbotOrderEvent(ABC):
             symbol, ord_ref, orderType=ord_type, action=action, orderId=ord_id
         )
         # Generate a unique timestamp for the order
-        unique_ts = str(time.time_ns() // 1000000)
+        unique_ts = str(now_ms())
 
         d_ord = OrderDBInfo(
             tv_price,  # use marketPrice instead of TradingView's price
@@ -110,7 +124,9 @@ class TbotOrderEvent(ABC):
             logger.debug(f"Creating a new portfolio entry for {symbol}")
             self.create_portfolio_info(unique_ts, d_ord)
 
-        u_ord = d_ord._replace(avgfillprice=item.averageCost, position=item.position)
+        u_ord = dataclasses.replace(
+            d_ord, avgfillprice=item.averageCost, position=item.position
+        )
         # Update the order information in the database
         self.orderdb.update_portfolio(
             get_timestamp(unique_ts),
@@ -122,11 +138,11 @@ class TbotOrderEvent(ABC):
 
     def on_new_order_event(self, trade: Trade):
         """Handle onNewOrderEvent from ib_insync"""
-        logger.trace(f"onNewOrderEvent: {trade}")
+        logger.trace("onNewOrderEvent: {}", trade)
 
     def on_cancel_order_event(self, trade: Trade):
         """Handle onCancelOrderEvent from ib_insync"""
-        logger.debug(f"onCancelOrderEvent: {trade}")
+        logger.debug("onCancelOrderEvent: {}", trade)
         self.orderdb.update_cancelled_order(trade.order.orderId)
 
     def on_pnl_single_event(self, pnl: PnLSingle):
@@ -171,7 +187,7 @@ class TbotOrderEvent(ABC):
         # if errorCode in msg_codes:
         if errCode >= -1:
             err_msg = ErrorDBInfo(
-                time.time_ns() // 1000000, reqId, errCode, sym, errStr
+                now_ms(), reqId, errCode, sym, errStr
             )
             self.create_error_order_info(err_msg)
 
@@ -179,7 +195,7 @@ class TbotOrderEvent(ABC):
         """Handle a modified event order
         This is event triggered by strategy.exit()
         """
-        logger.debug(f"onOrderModifyEvent: {trade}")
+        logger.debug("onOrderModifyEvent: {}", trade)
         self.on_order_common_event(trade)
 
     def on_order_status_ptf_position(self, contract: Contract, position: float):
@@ -192,7 +208,7 @@ class TbotOrderEvent(ABC):
 
     def on_order_status(self, trade: Trade):
         """Updates Order Status from ib insync"""
-        logger.debug(f"onOrderStatus: {trade}")
+        logger.debug("onOrderStatus: {}", trade)
         self.on_order_common_event(trade)
         if trade.orderStatus.status == OrderStatus.Filled:
             # See whether we can update position of portfolio very quickly without waiting for a few seconds
@@ -212,14 +228,9 @@ class TbotOrderEvent(ABC):
             )
             logger.debug(msg)
         if self.orderdb.find_order_exists_by_ord_id(trade.order.orderId):
-            lmt_price, aux_price = 0.0, 0.0
-            if trade.order.orderType == "LMT":
-                lmt_price = trade.order.lmtPrice
-            elif trade.order.orderType == "STP":
-                aux_price = trade.order.auxPrice
-            elif trade.order.orderType == "STP LMT":
-                lmt_price = trade.order.lmtPrice
-                aux_price = trade.order.auxPrice
+            lmt_price, aux_price = _PRICE_DISPATCH.get(
+                trade.order.orderType, _zero_pair
+            )(trade.order)
             d_ord = OrderDBInfo(
                 tvPrice=0.0,  # not used
                 orderId=trade.order.orderId,
@@ -251,7 +262,7 @@ class TbotOrderEvent(ABC):
                 trade.order.orderRef,
                 trade.orderStatus.parentId,
             )
-            unique_ts = str(time.time_ns() // 1000000)
+            unique_ts = str(now_ms())
             self.create_order_info(unique_ts, d_ord)
         if __debug__:
             self.orderdb.display()
@@ -261,7 +272,7 @@ class TbotOrderEvent(ABC):
         This func handles both live fills and responses to
         reqExecution
         """
-        logger.debug(f"onExecDetails {fill.execution} {trade}")
+        logger.debug("onExecDetails {} {}", fill.execution, trade)
 
     def on_open_order_event(self, trade: Trade):
         """Callback function for new open order event from Master client ID"""
@@ -291,7 +302,7 @@ class TbotOrderEvent(ABC):
                 trade.order.orderRef,
                 trade.orderStatus.parentId,
             )
-            unique_ts = str(time.time_ns() // 1000000)
+            unique_ts = str(now_ms())
             self.create_order_info(unique_ts, d_ord)
 
     def install_event_hdlrs(self):
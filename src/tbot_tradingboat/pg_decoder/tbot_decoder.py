@@ -2,7 +2,7 @@
 """
 TradingBoat © Copyright, Plusgenie Limited 2023. All Rights Reserved.
 """
-from typing import Dict, Tuple
+from typing import Dict, List, Tuple
 import logging
 import os
 import sys
@@ -11,20 +11,25 @@ import errno
 import socket
 import time
 import shutil
-import re
-from dataclasses import dataclass
+from collections import deque
+from types import MappingProxyType
 import sqlite3
 
-from ib_insync import util, IB, OrderStatus
+from ib_insync import util, IB, OrderStatus, Trade, AccountValue
 from loguru import logger
-import numpy as np
 
 from tbot_tradingboat.pg_database.alertdb import TbotAlertDB
 from tbot_tradingboat.pg_database.orderdb import TbotOrderDB
 from tbot_tradingboat.pg_database.errordb import TbotErrorDB
+from tbot_tradingboat.pg_database.tbot_db import open_sqlite3, close_sqlite3
 from tbot_tradingboat.utils.tbot_env import shared
 from tbot_tradingboat.utils.objects import OrderTV, AlertDBInfo, ErrorStates
-from tbot_tradingboat.utils.constants import TBOT_PUT_REDIS_EVENT_SLEEP_SEC
+from tbot_tradingboat.utils.constants import (
+    TBOT_PUT_REDIS_EVENT_SLEEP_SEC,
+    TBOT_ACCOUNT_FUNDS_TTL_SEC,
+    TBOT_ALERT_BATCH_MAX,
+    TBOT_ALERT_FLUSH_MS,
+)
 from tbot_tradingboat.pg_decoder.ib_api.tbot_api import (
     get_ordref_ex,
     get_ordref_ex_prefix,
@@ -34,18 +39,115 @@ from tbot_tradingboat.pg_decoder.ib_api.tbot_api import (
     TBOT_ALL_CONTRACTS_NUM,
     TBOT_STRATEGY_CLOSE_ORDERDB_LOOPBACK,
 )
-from tbot_tradingboat.utils.tbot_utils import strtobool
+from tbot_tradingboat.utils.tbot_utils import strtobool, now_ms
 
 from .ib_api.tbot_order import TbotOrder
 from .tbot_observer import TbotObserver
 
+# TradingView's direction -> action
+TBOT_TV_ACTIONS = MappingProxyType(
+    {
+        "strategy.entrylong": "BUY",
+        "strategy.entryshort": "SELL",
+        "strategy.close": "CLOSE",
+        "strategy.close_all": "CLOSE_ALL",
+        "strategy.exitlong": "SELL",
+        "strategy.exitshort": "BUY",
+        "strategy.cancellong": "CANCEL",
+        "strategy.cancelshort": "CANCEL",
+        "strategy.cancel_all": "CANCEL_ALL",
+        "strategy.alert": "ALERT",
+    }
+)
+TBOT_TV_SEC_TYPES = frozenset(("stock", "forex", "crypto"))
+# TradingView contract -> IB secType used for the balance check
+TBOT_TV_TO_IB_SEC_TYPE = MappingProxyType(
+    {"stock": "STK", "forex": "CASH", "crypto": "CRYPTO"}
+)
+
+# Bitmask of non-zero prices: entryLimit, entryStop, exitLimit, exitStop
+# strategy.entry(): mask -> (price for the balance check, TbotOrder method)
+TBOT_ENTRY_DISPATCH = {
+    0b0000: ("price", "place_market_order"),
+    0b1000: ("entryLimit", "place_limit_order"),
+    0b0100: ("entryStop", "place_stop_order"),
+    0b1100: ("entryStop", "place_stop_limit_order"),
+    0b1011: ("entryLimit", "place_bracket_limit_order"),
+    0b0010: ("entryLimit", "place_market_then_limit_order"),
+    0b0001: ("entryLimit", "place_market_then_stop_order"),
+    0b1010: ("entryLimit", "place_limit_then_limit_order"),
+    0b1001: ("entryLimit", "place_limit_then_stop_order"),
+    0b0111: ("entryStop", "place_bracket_stop_order"),
+    0b0011: ("price", "place_bracket_market_order"),
+}
+# strategy.exit(): mask -> TbotOrder method
+TBOT_EXIT_DISPATCH = {
+    0b0011: "place_updated_bracket_order",
+    0b0010: "place_updated_limit_order",
+    0b0001: "place_updated_stop_order",
+}
+
+# Position of each metric in the tuple returned by extract_order_values()
+TBOT_METRICS_INDEX = {
+    "qty": 0,
+    "price": 1,  # midpoint
+    "entry.stop": 2,
+    "entry.limit": 3,
+    "exit.stop": 4,
+    "exit.limit": 5,
+}
+
+
+def get_price_mask(t_ord: OrderTV) -> int:
+    """Packs the positive entry/exit prices of the order into a 4-bit mask"""
+    return (
+        (t_ord.entryLimit > 0) << 3
+        | (t_ord.entryStop > 0) << 2
+        | (t_ord.exitLimit > 0) << 1
+        | (t_ord.exitStop > 0)
+    )
+
+
+def unsupported_order_type(t_ord: OrderTV) -> ErrorStates:
+    """Logs the rejected price combination; only runs on the error path"""
+    logger.error(
+        "Unsupported orderType combinations: {}",
+        [t_ord.entryLimit, t_ord.entryStop, t_ord.exitLimit, t_ord.exitStop],
+    )
+    return ErrorStates.EBADORDTP
+
 
-@dataclass
 class TBOTDecoder(TbotObserver):
     """
     The Observer interface declares the update method, used by subjects.
     """
 
+    # __weakref__ is required as ib_insync events keep weak refs to handlers
+    __slots__ = (
+        "__weakref__",
+        "ibsyn",
+        "orderdb",
+        "alertdb",
+        "errordb",
+        "conn",
+        "torder",
+        "loop",
+        "_connected",
+        "profiler",
+        "db_display",
+        "_ordref_prefix",
+        "alert_queue",
+        "_alert_flush_due",
+        "_trade_index",
+        "_symbol_index",
+        "_trade_keys",
+        "_funds_by_account",
+        "_avail_funds",
+        "_avail_funds_ts",
+        "_base_account",
+        "_direction_handlers",
+    )
+
     def __init__(self):
         """Initialize ib_insync"""
         self.ibsyn = IB()
@@ -54,16 +156,57 @@ class TBOTDecoder(TbotObserver):
         self.orderdb = TbotOrderDB()
         self.alertdb = TbotAlertDB()
         self.errordb = TbotErrorDB()
+        # A single sqlite3 connection shared by the order/alert/error tables
+        self.conn = None
         self.torder = TbotOrder(self.ibsyn, self.orderdb, self.errordb)
         self.loop = None
+        # Kept in sync by connectedEvent/disconnectedEvent
+        self._connected = False
+        self.ibsyn.connectedEvent += self._on_connected
+        self.ibsyn.disconnectedEvent += self._on_disconnected
         self.profiler = strtobool(shared.profiler)
+        self.db_display = strtobool(shared.db_display)
+        # TBOT_CLIENTID is fixed for the lifetime of the process
+        self._ordref_prefix = get_ordref_ex_prefix()
+        # Alerts waiting to be written by flush_alerts()
+        self.alert_queue = deque()
+        # Monotonic time by which the oldest queued alert must be written
+        self._alert_flush_due = 0.0
+        # Open trades indexed by (ticker, orderRef, action) and by ticker
+        self._trade_index: Dict[Tuple[str, str, str], Dict[int, Trade]] = {}
+        self._symbol_index: Dict[str, Dict[int, Trade]] = {}
+        # Key each trade was indexed under, as orderRef/action may change later
+        self._trade_keys: Dict[int, Tuple[str, str, str]] = {}
+        self.ibsyn.newOrderEvent += self._index_trade
+        self.ibsyn.openOrderEvent += self._index_trade
+        self.ibsyn.orderStatusEvent += self._on_order_status_index
+        # AvailableFunds pushed by accountSummaryEvent, keyed by currency.
+        # The empty key holds the funds of the first (base) account.
+        self._funds_by_account: Dict[Tuple[str, str], float] = {}
+        self._avail_funds: Dict[str, float] = {}
+        self._avail_funds_ts = 0.0
+        self._base_account = ""
+        self.ibsyn.accountSummaryEvent += self._on_account_summary
+        # strategy.* direction -> handler used by submit_order()
+        self._direction_handlers = {
+            "strategy.entrylong": self.ib_strategy_entry,
+            "strategy.entryshort": self.ib_strategy_entry,
+            "strategy.close": self.ib_strategy_close,
+            "strategy.close_all": self.ib_strategy_close_all_cancel_all,
+            "strategy.cancellong": self.ib_strategy_cancellong,
+            "strategy.cancelshort": self.ib_strategy_cancelshort,
+            "strategy.cancel_all": self.ib_strategy_cancel_all,
+            "strategy.exitlong": self.ib_strategy_exitlong,
+            "strategy.exitshort": self.ib_strategy_exitshort,
+        }
 
     def open(self):
         try:
             self._copy_sqlite3_to_dest(shared.db_office, shared.db_home)
-            self.orderdb.setup_connection(shared.db_office)
-            self.alertdb.setup_connection(shared.db_office)
-            self.errordb.setup_connection(shared.db_office)
+            self.conn = open_sqlite3(shared.db_office)
+            self.orderdb.setup_connection(shared.db_office, conn=self.conn)
+            self.alertdb.setup_connection(shared.db_office, conn=self.conn)
+            self.errordb.setup_connection(shared.db_office, conn=self.conn)
         except sqlite3.OperationalError as err:
             logger.exception(f"{err}: {shared.db_office}")
             raise
@@ -75,15 +218,118 @@ class TBOTDecoder(TbotObserver):
         Handles API Error Events
         """
         logger.warning(f"{msg}")
-        if re.search("Peer closed", msg, re.IGNORECASE):
+        if "peer closed" in msg.lower():
             logger.debug("please check Auto Restart Time in TWS")
             logger.warning("restarting the connection to TWS")
 
+    def _index_trade(self, trade: Trade):
+        """Adds an open trade into the trade indexes, re-keying it if needed"""
+        symbol = get_ticker(trade.contract)
+        key = (symbol, trade.order.orderRef, trade.order.action)
+        old_key = self._trade_keys.get(id(trade))
+        if old_key == key:
+            return
+        if old_key is not None:
+            self._unindex_trade(trade)
+        self._trade_keys[id(trade)] = key
+        self._trade_index.setdefault(key, {})[id(trade)] = trade
+        self._symbol_index.setdefault(symbol, {})[id(trade)] = trade
+
+    def _unindex_trade(self, trade: Trade):
+        """Removes a trade from the trade indexes by the key it was indexed under"""
+        key = self._trade_keys.pop(id(trade), None)
+        if key is None:
+            return
+        self._pop_from_bucket(self._trade_index, key, id(trade))
+        self._pop_from_bucket(self._symbol_index, key[0], id(trade))
+
+    @staticmethod
+    def _pop_from_bucket(index: Dict, bucket_key, trade_id: int):
+        """Removes the trade from its bucket and drops the bucket once empty"""
+        bucket = index.get(bucket_key)
+        if bucket is not None:
+            bucket.pop(trade_id, None)
+            if not bucket:
+                del index[bucket_key]
+
+    def _on_order_status_index(self, trade: Trade):
+        """Keeps the trade indexes in line with orderStatusEvent"""
+        if trade.orderStatus.status in OrderStatus.DoneStates:
+            self._unindex_trade(trade)
+        else:
+            self._index_trade(trade)
+
+    def _rebuild_trade_index(self):
+        """Rebuilds the trade indexes from openTrades() after (re)connecting"""
+        self._trade_index.clear()
+        self._symbol_index.clear()
+        self._trade_keys.clear()
+        for trd in self.ibsyn.openTrades():
+            self._index_trade(trd)
+
+    def _find_open_trades(self, symbol: str, ord_ref: str, action: str) -> List[Trade]:
+        """Returns open trades with the same symbol, orderRef and action"""
+        bucket = self._trade_index.get((symbol, ord_ref, action), {})
+        return [trd for trd in bucket.values() if not trd.isDone()]
+
+    def _find_open_trades_by_prefix(self, symbol: str, prefix: str) -> List[Trade]:
+        """Returns open trades of the symbol whose orderRef starts with prefix"""
+        bucket = self._symbol_index.get(symbol, {})
+        return [
+            trd
+            for trd in bucket.values()
+            if trd.order.orderRef.startswith(prefix) and not trd.isDone()
+        ]
+
+    def _on_account_summary(self, val: AccountValue):
+        """Caches AvailableFunds from accountSummaryEvent"""
+        if val.tag != "AvailableFunds":
+            return
+        try:
+            funds = float(val.value)
+        except ValueError:
+            logger.warning(f"Ignoring invalid AvailableFunds: {val}")
+            return
+        if not self._base_account:
+            self._base_account = self._find_base_account() or val.account
+        # Keep the per-currency total in step with the per-account value
+        prev = self._funds_by_account.get((val.account, val.currency), 0.0)
+        self._funds_by_account[(val.account, val.currency)] = funds
+        self._avail_funds[val.currency] = (
+            self._avail_funds.get(val.currency, 0.0) + funds - prev
+        )
+        if val.account == self._base_account:
+            self._avail_funds[""] = funds
+        self._avail_funds_ts = time.monotonic()
+
+    def _find_base_account(self) -> str:
+        """
+        Returns the account of the first AvailableFunds item in accountSummary(),
+        as ib_check_balance() used to, or else the first managed account
+        """
+        for item in self.ibsyn.accountSummary():
+            if item.tag == "AvailableFunds":
+                return item.account
+        accounts = self.ibsyn.managedAccounts()
+        return accounts[0] if accounts else ""
+
+    def _refresh_available_funds(self):
+        """Refreshes the AvailableFunds cache once it is older than the TTL"""
+        if time.monotonic() - self._avail_funds_ts <= TBOT_ACCOUNT_FUNDS_TTL_SEC:
+            return
+        for item in self.ibsyn.accountSummary():
+            self._on_account_summary(item)
+        self._avail_funds_ts = time.monotonic()
+
+    def _on_connected(self):
+        self._connected = True
+
+    def _on_disconnected(self):
+        self._connected = False
+
     def is_connected(self) -> bool:
         """Check if the app is connected to IB/TWS"""
-        con_a = bool(self.loop)
-        con_b = self.ibsyn.isConnected()
-        return con_a and con_b
+        return self._connected and bool(self.loop)
 
     def ib_strategy_cancel_a_contract(
         self, t_ord: OrderTV, action: str = "SELL"
@@ -93,28 +339,24 @@ class TBOTDecoder(TbotObserver):
         Returns True if the order was successfully cancelled, False otherwise.
         """
         # Find the order(s) associated with the contract and order reference
-        trades = [
-            trd
-            for trd in self.ibsyn.openTrades()
-            if get_ticker(trd.contract) == t_ord.symbol
-            and trd.order.orderRef == t_ord.orderRef
-            and trd.order.action == action
-        ]
+        trades = self._find_open_trades(t_ord.symbol, t_ord.orderRef, action)
+        return self._cancel_trades(t_ord, trades)
 
-        # Cancel the order(s)
+    def _cancel_trades(self, t_ord: OrderTV, trades: List[Trade]) -> ErrorStates:
+        """Cancels the given open trades unless they are already pending cancel"""
         if trades:
             count = 0
             for trd in trades:
                 if trd.orderStatus.status != OrderStatus.PendingCancel:
                     self.ibsyn.cancelOrder(trd.order)
                     msg = (
-                        f"Cacnceling open order: {t_ord.symbol},{trd.order.orderId},"
+                        f"Cancelling open order: {t_ord.symbol},{trd.order.orderId},"
                         f"{trd.order.orderType},{trd.order.totalQuantity}"
                     )
                     logger.warning(msg)
                     count += 1
                 else:
-                    logger.debug(f"ignoring PendingCancel {trd.orderStatus}")
+                    logger.debug("ignoring PendingCancel {}", trd.orderStatus)
             logger.success(f"Cancelled total {count} orders")
             util.sleep(0)  # Refresh openOrders
             return ErrorStates.SUBMITTED
@@ -143,33 +385,8 @@ class TBOTDecoder(TbotObserver):
 
         https://www.tradingview.com/pine-script-reference/v5/#fun_strategy{dot}cancel_all
         """
-        trades = [
-            trd
-            for trd in self.ibsyn.openTrades()
-            if get_ticker(trd.contract) == t_ord.symbol
-            and trd.order.orderRef.startswith(get_ordref_ex_prefix())
-        ]
-
-        # Cancel the order(s)
-        if trades:
-            count = 0
-            for trd in trades:
-                if trd.orderStatus.status != OrderStatus.PendingCancel:
-                    self.ibsyn.cancelOrder(trd.order)
-                    msg = (
-                        f"Cancelling open order: {t_ord.symbol},{trd.order.orderId},"
-                        f"{trd.order.orderType},{trd.order.totalQuantity}"
-                    )
-                    logger.warning(msg)
-                    count += 1
-                else:
-                    logger.debug(f"ignoring PendingCancel {trd.orderStatus}")
-                logger.success(f"Cancelled total {count} orders")
-            util.sleep(0)  # Refresh openOrders
-            return ErrorStates.SUBMITTED
-
-        logger.warning(f"No open order found for {t_ord}")
-        return ErrorStates.ENOOPNTRD
+        trades = self._find_open_trades_by_prefix(t_ord.symbol, self._ordref_prefix)
+        return self._cancel_trades(t_ord, trades)
 
     def ib_strategy_exitlong(self, t_ord: OrderTV) -> ErrorStates:
         """
@@ -207,19 +424,12 @@ class TBOTDecoder(TbotObserver):
         Implements TradingView's strategy.exit().
          https://www.tradingview.com/pine-script-reference/v5/#fun_strategy{dot}exit
         """
-        _x = [t_ord.entryLimit, t_ord.entryStop, t_ord.exitLimit, t_ord.exitStop]
-        _y = np.array(_x)
-        logger.debug(f"args: {t_ord}")
-        vec = np.where(_y > 0, 1, 0)
-        if (vec == np.array([0, 0, 1, 1])).all():
-            state = self.torder.place_updated_bracket_order(t_ord)
-        elif (vec == np.array([0, 0, 1, 0])).all():
-            state = self.torder.place_updated_limit_order(t_ord)
-        elif (vec == np.array([0, 0, 0, 1])).all():
-            state = self.torder.place_updated_stop_order(t_ord)
+        logger.opt(lazy=True).debug("args: {}", lambda: t_ord)
+        method = TBOT_EXIT_DISPATCH.get(get_price_mask(t_ord))
+        if method:
+            state = getattr(self.torder, method)(t_ord)
         else:
-            logger.error(f"Unsupported orderType combinations: {_x}")
-            state = ErrorStates.EBADORDTP
+            state = unsupported_order_type(t_ord)
 
         return state
 
@@ -235,46 +445,14 @@ class TBOTDecoder(TbotObserver):
             return ErrorStates.EBADMSG
 
         state = ErrorStates.UNRECOG
-        _x = [t_ord.entryLimit, t_ord.entryStop, t_ord.exitLimit, t_ord.exitStop]
-        _y = np.array(_x)
-        logger.trace(f"args: {t_ord}")
-        vec = np.where(_y > 0, 1, 0)
-        if (vec == np.array([0, 0, 0, 0])).all():
-            if self.ib_check_balance(t_ord, t_ord.price):
-                state = self.torder.place_market_order(t_ord)
-        elif (vec == np.array([1, 0, 0, 0])).all():
-            if self.ib_check_balance(t_ord, t_ord.entryLimit):
-                state = self.torder.place_limit_order(t_ord)
-        elif (vec == np.array([0, 1, 0, 0])).all():
-            if self.ib_check_balance(t_ord, t_ord.entryStop):
-                state = self.torder.place_stop_order(t_ord)
-        elif (vec == np.array([1, 1, 0, 0])).all():
-            if self.ib_check_balance(t_ord, t_ord.entryStop):
-                state = self.torder.place_stop_limit_order(t_ord)
-        elif (vec == np.array([1, 0, 1, 1])).all():
-            if self.ib_check_balance(t_ord, t_ord.entryLimit):
-                state = self.torder.place_bracket_limit_order(t_ord)
-        elif (vec == np.array([0, 0, 1, 0])).all():
-            if self.ib_check_balance(t_ord, t_ord.entryLimit):
-                state = self.torder.place_market_then_limit_order(t_ord)
-        elif (vec == np.array([0, 0, 0, 1])).all():
-            if self.ib_check_balance(t_ord, t_ord.entryLimit):
-                state = self.torder.place_market_then_stop_order(t_ord)
-        elif (vec == np.array([1, 0, 1, 0])).all():
-            if self.ib_check_balance(t_ord, t_ord.entryLimit):
-                state = self.torder.place_limit_then_limit_order(t_ord)
-        elif (vec == np.array([1, 0, 0, 1])).all():
-            if self.ib_check_balance(t_ord, t_ord.entryLimit):
-                state = self.torder.place_limit_then_stop_order(t_ord)
-        elif (vec == np.array([0, 1, 1, 1])).all():
-            if self.ib_check_balance(t_ord, t_ord.entryStop):
-                state = self.torder.place_bracket_stop_order(t_ord)
-        elif (vec == np.array([0, 0, 1, 1])).all():
-            if self.ib_check_balance(t_ord, t_ord.price):
-                state = self.torder.place_bracket_market_order(t_ord)
+        logger.opt(lazy=True).trace("args: {}", lambda: t_ord)
+        entry = TBOT_ENTRY_DISPATCH.get(get_price_mask(t_ord))
+        if entry:
+            price_attr, method = entry
+            if self.ib_check_balance(t_ord, getattr(t_ord, price_attr)):
+                state = getattr(self.torder, method)(t_ord)
         else:
-            logger.error(f"Unsupported orderType combinations: {_x}")
-            state = ErrorStates.EBADORDTP
+            state = unsupported_order_type(t_ord)
 
         return state
 
@@ -286,7 +464,7 @@ class TBOTDecoder(TbotObserver):
         # First call cancel_all() is optional for close_all()
         state = self.ib_strategy_cancel_all(t_ord)
         if state != ErrorStates.SUBMITTED:
-            logger.info(f"cancel_all(): ErrorStates={state.name}")
+            logger.info("cancel_all(): ErrorStates={}", state.name)
         # And then call close_all()
         return self.ib_strategy_close_all(t_ord)
 
@@ -334,16 +512,12 @@ class TBOTDecoder(TbotObserver):
             )
             return err
 
-        _x = [t_ord.entryLimit, t_ord.entryStop, t_ord.exitLimit, t_ord.exitStop]
-        _y = np.array(_x)
-        vec = np.where(_y > 0, 1, 0)
-        if (vec == np.array([0, 0, 0, 0])).all():
+        if get_price_mask(t_ord) == 0b0000:
             t_ord_new = t_ord._replace(qty=qty, action=action)
-            logger.info(f"Order qty is adjusted from {t_ord.qty} to {qty}")
+            logger.info("Order qty is adjusted from {} to {}", t_ord.qty, qty)
             state = self.torder.place_market_order(t_ord_new)
         else:
-            logger.error(f"Unsupported orderType combinations: {_x}")
-            state = ErrorStates.EBADORDTP
+            state = unsupported_order_type(t_ord)
 
         return state
 
@@ -357,49 +531,54 @@ class TBOTDecoder(TbotObserver):
         timestamp = data_dict.get("timestamp", "")
         return symbol, currency, metrics, timeframe, orderRef, timestamp
 
+    def is_valid_order_fields(
+        self, timestamp, contract, symbol, currency, ord_ref_ex, metrics
+    ) -> bool:
+        """Checks the mandatory fields of the webhook, cheapest test first"""
+        if not timestamp:
+            reason = "timestamp"
+        elif not contract:
+            reason = "contract"
+        elif not symbol:
+            reason = "ticker"
+        elif not currency:
+            reason = "currency"
+        elif not ord_ref_ex:
+            reason = "orderRef"
+        elif not isinstance(metrics, list) or not metrics:
+            reason = "metrics"
+        else:
+            return True
+        logger.error(
+            f"[X]: invalid msg format({reason}): sym:{symbol}, "
+            f"currency:{currency}, ref:{ord_ref_ex}"
+        )
+        return False
+
     def extract_order_values(self, metrics) -> Tuple:
         """Extract order values"""
-        qty = 0.0
-        price = entryStop = entryLimit = exitStop = exitLimit = 0.0
+        values = [0.0] * len(TBOT_METRICS_INDEX)
         for mdict in metrics:
-            if mdict["name"] == "qty":
-                qty = mdict["value"]
-            if mdict["name"] == "entry.stop":
-                entryStop = mdict["value"]
-            if mdict["name"] == "entry.limit":
-                entryLimit = mdict["value"]
-            if mdict["name"] == "exit.stop":
-                exitStop = mdict["value"]
-            if mdict["name"] == "exit.limit":
-                exitLimit = mdict["value"]
-            if mdict["name"] == "price":
-                price = mdict["value"]  # midpoint
-        return qty, price, entryStop, entryLimit, exitStop, exitLimit
+            idx = TBOT_METRICS_INDEX.get(mdict["name"])
+            if idx is not None:
+                values[idx] = mdict["value"]
+        return tuple(values)
 
     def submit_order(self, direction: str, t_ord: OrderTV) -> ErrorStates:
         """Place order into ib_insync"""
         state = ErrorStates.UNRECOG
-        logger.info(f"order: {t_ord.symbol}, {direction}, {t_ord.orderRef}")
-        if direction in ("strategy.entrylong", "strategy.entryshort"):
-            state = self.ib_strategy_entry(t_ord)
-        elif direction == "strategy.close":
-            state = self.ib_strategy_close(t_ord)
-        elif direction == "strategy.close_all":
-            state = self.ib_strategy_close_all_cancel_all(t_ord)
-        elif direction == "strategy.cancellong":
-            state = self.ib_strategy_cancellong(t_ord)
-        elif direction == "strategy.cancelshort":
-            state = self.ib_strategy_cancelshort(t_ord)
-        elif direction == "strategy.cancel_all":
-            state = self.ib_strategy_cancel_all(t_ord)
-        elif direction == "strategy.exitlong":
-            state = self.ib_strategy_exitlong(t_ord)
-        elif direction == "strategy.exitshort":
-            state = self.ib_strategy_exitshort(t_ord)
+        logger.info("order: {}, {}, {}", t_ord.symbol, direction, t_ord.orderRef)
+        handler = self._direction_handlers.get(direction)
+        if handler:
+            state = handler(t_ord)
         else:
             logger.critical(f"Unexpected direction: {direction}")
         logger.info(
-            f"order: {t_ord.symbol}, {direction}, {t_ord.orderRef}, exit: {state.name}"
+            "order: {}, {}, {}, exit: {}",
+            t_ord.symbol,
+            direction,
+            t_ord.orderRef,
+            state.name,
         )
         return state
 
@@ -410,18 +589,6 @@ class TBOTDecoder(TbotObserver):
         - Market Order, Limit Order, Bracket Order
         """
         rv_state = ErrorStates.UNRECOG
-        action_dict = {
-            "strategy.entrylong": "BUY",
-            "strategy.entryshort": "SELL",
-            "strategy.close": "CLOSE",
-            "strategy.close_all": "CLOSE_ALL",
-            "strategy.exitlong": "SELL",
-            "strategy.exitshort": "BUY",
-            "strategy.cancellong": "CANCEL",
-            "strategy.cancelshort": "CANCEL",
-            "strategy.cancel_all": "CANCEL_ALL",
-            "strategy.alert": "ALERT",
-        }
         (
             symbol,
             currency,
@@ -431,14 +598,13 @@ class TBOTDecoder(TbotObserver):
             timestamp,
         ) = self.extract_order_parameters(data_dict)
         orderRefEx = get_ordref_ex(timeframe, orderRef)
-        tvSecType = ("stock", "forex", "crypto")
         _contract = data_dict.get("contract", "").strip().lower()
-        if _contract in tvSecType:
+        if _contract in TBOT_TV_SEC_TYPES:
             contract = _contract
         else:
             contract = None
         direction = data_dict.get("direction", "").strip()
-        action = action_dict.get(direction, None)
+        action = TBOT_TV_ACTIONS.get(direction, None)
         if not action:
             logger.error(f"[X]: invalid msg format: direction(action):{direction}")
             rv_state = ErrorStates.EBADMSG
@@ -451,19 +617,9 @@ class TBOTDecoder(TbotObserver):
                 ),
             )
             return None
-        if not (
-            timestamp
-            and contract
-            and symbol
-            and currency
-            and orderRefEx
-            and contract
-            and metrics
-            and isinstance(metrics, list)
+        if not self.is_valid_order_fields(
+            timestamp, contract, symbol, currency, orderRefEx, metrics
         ):
-            logger.error(
-                f"[X]: invalid msg format: sym:{symbol}, currency:{currency}, ref:{orderRefEx}"
-            )
             rv_state = ErrorStates.EBADMSG
             self.ib_create_alert_info(
                 unique_key,
@@ -530,15 +686,23 @@ class TBOTDecoder(TbotObserver):
         redis_ts_ms: at the time of receving the webhook and push it into Redis
         ibkr_ts_ms: at the time of placing order
         """
-        ibkr_ts_ms = time.time_ns() // 1000000
+        if not self.profiler:
+            return
+        # Wall clock on purpose: the timestamps come from other hosts
+        ibkr_ts_ms = now_ms()
+        lazy_log = logger.opt(lazy=True)
         if redis_ts_ms:
-            logger.debug(
-                f"E-2-E: from TradingView to Flask: {redis_ts_ms - tv_ts_m} ms"
+            lazy_log.debug(
+                "E-2-E: from TradingView to Flask: {} ms",
+                lambda: redis_ts_ms - tv_ts_m,
             )
-            logger.trace(
-                f"E-2-E: from Flask to RedisSub: {ibkr_ts_ms - redis_ts_ms} ms"
+            lazy_log.trace(
+                "E-2-E: from Flask to RedisSub: {} ms",
+                lambda: ibkr_ts_ms - redis_ts_ms,
             )
-        logger.trace(f"E-2-E: from TradingView to RedisSub: {ibkr_ts_ms - tv_ts_m} ms")
+        lazy_log.trace(
+            "E-2-E: from TradingView to RedisSub: {} ms", lambda: ibkr_ts_ms - tv_ts_m
+        )
 
     def connect(self) -> bool:
         """
@@ -554,6 +718,7 @@ class TBOTDecoder(TbotObserver):
                 clientId=int(shared.client_id),
             )
             self.loop = util.getLoop()
+            self._rebuild_trade_index()
             logger.success("The connection to IBKR done well")
             ret = True
         except socket.error:
@@ -584,6 +749,10 @@ class TBOTDecoder(TbotObserver):
             caller: subject in Observer's design pattern
             data_dict: Tradingview WEBHOOK message
         """
+        # Queued alerts must not wait for IB to come back
+        if self.alert_queue and time.monotonic() >= self._alert_flush_due:
+            self.flush_alerts()
+
         # Verify connection regardless of data_dict's status
         if not self.is_connected():
             self.connect()
@@ -606,56 +775,26 @@ class TBOTDecoder(TbotObserver):
                     caller.delete_event(redis_stream_id)
                 logger.debug("Completed the message delivery")
             else:
+                self.flush_alerts()
                 # Give time to async loop
                 util.sleep(TBOT_PUT_REDIS_EVENT_SLEEP_SEC)
 
     def ib_check_balance(self, t_ord: OrderTV, price: float) -> bool:
-        """Get the account summary"""
-        account_summary = self.ibsyn.accountSummary()
+        """Check the order against AvailableFunds of the account summary"""
+        self._refresh_available_funds()
         currency = t_ord.currency
-        sec_type = (
-            "STK"
-            if t_ord.contract == "stock"
-            else "CASH"
-            if t_ord.contract == "forex"
-            else "CRYPTO"
-            if t_ord.contract == "crypto"
-            else None
-        )
-        # Find the available cash balance in the appropriate currency
-        if sec_type == "STK":
-            available_funds_str = next(
-                (
-                    item.value
-                    for item in account_summary
-                    if item.tag == "AvailableFunds"
-                ),
-                None,
-            )
-        elif sec_type == "CASH" and currency is not None:
-            available_funds_str = sum(
-                item.value
-                for item in account_summary
-                if item.tag == "AvailableFunds" and item.currency == currency
-            )
-        elif sec_type == "CRYPTO":
-            available_funds_str = next(
-                (
-                    item.value
-                    for item in account_summary
-                    if item.tag == "AvailableFunds"
-                ),
-                None,
-            )
-        else:
+        sec_type = TBOT_TV_TO_IB_SEC_TYPE.get(t_ord.contract)
+        if sec_type is None or (sec_type == "CASH" and currency is None):
             logger.critical(
                 f"Invalid security type {sec_type} or missing currency for Forex trade"
             )
             return False
+        # Forex is funded in its own currency, the others in the base currency
+        available_funds = self._avail_funds.get(
+            currency if sec_type == "CASH" else "", 0.0
+        )
 
-        if available_funds_str:
-            available_funds = float(available_funds_str)
-        else:
+        if not available_funds:
             logger.error(
                 f"No available funds found for sec_type: {sec_type} and currency: {currency}"
             )
@@ -668,33 +807,66 @@ class TBOTDecoder(TbotObserver):
         # Check if the user has enough balance to buy
         if total_cost <= available_funds:
             logger.info(
-                f"total_cost:{total_cost} <= available_funds:{available_funds_str}"
+                "total_cost:{} <= available_funds:{}", total_cost, available_funds
             )
             return True
         else:
             logger.error(
-                f"total_cost:{total_cost} > available_funds:{available_funds_str}"
+                "total_cost:{} > available_funds:{}", total_cost, available_funds
             )
             return False
 
     def ib_create_alert_info(self, unique_ts: str, alt: AlertDBInfo):
         """
-        Saves TradingView's alerts into the database
+        Queues TradingView's alerts for the database
+
+        The queue is flushed when the event loop is idle, becomes too long or
+        its oldest alert waited TBOT_ALERT_FLUSH_MS.
         """
-        self.alertdb.insert(unique_ts, alt)
-        if __debug__:
+        if not self.alert_queue:
+            self._alert_flush_due = time.monotonic() + TBOT_ALERT_FLUSH_MS / 1000
+        self.alert_queue.append((unique_ts, alt))
+        if len(self.alert_queue) >= TBOT_ALERT_BATCH_MAX:
+            self.flush_alerts()
+
+    def flush_alerts(self):
+        """Saves the queued alerts into the database in one transaction"""
+        if not self.alert_queue:
+            return
+        batch = list(self.alert_queue)
+        self.alert_queue.clear()
+        self.alertdb.insert_many(batch)
+        if self.db_display:
             self.alertdb.display()
 
     def ib_enable_log(self, level=logging.ERROR):
         """Enables ib insync logging"""
         util.logToConsole(level)
 
-    def _copy_sqlite3_to_dest(self, dest: str, src: str):
+    def _copy_sqlite3_to_dest(self, dest: str, src: str, checkpointed: bool = True):
         try:
             if os.path.exists(src):
+                if os.path.realpath(src) == os.path.realpath(dest):
+                    logger.trace(f"sqlite3: {src} is already in place")
+                    return
+                # Committed rows still in the WAL would be lost without it
+                wal = f"{src}-wal"
+                if not checkpointed or (
+                    os.path.exists(wal) and os.path.getsize(wal) > 0
+                ):
+                    logger.error(
+                        f"sqlite3: WAL of {src} is not checkpointed, not moving it"
+                    )
+                    return
                 if os.path.exists(dest):
                     logger.debug(f"sqlite3: overwriting {dest}")
-                shutil.move(src, dest)
+                try:
+                    # Rename within the same filesystem without copying data
+                    os.replace(src, dest)
+                except OSError as err:
+                    if err.errno != errno.EXDEV:
+                        raise
+                    shutil.move(src, dest)
         except IOError as err:
             logger.critical(f"sqlite3: unable to overwrite file {err}")
             raise
@@ -713,6 +885,7 @@ class TBOTDecoder(TbotObserver):
 
     def _close_db(self):
         logger.info("closing sqlite3")
+        self.flush_alerts()
         if self.torder:
             self.torder.close()
         if self.alertdb:
@@ -721,7 +894,11 @@ class TBOTDecoder(TbotObserver):
             self.orderdb.close()
         if self.errordb:
             self.errordb.close()
-        self._copy_sqlite3_to_dest(shared.db_home, shared.db_office)
+        checkpointed = True
+        if self.conn:
+            checkpointed = close_sqlite3(self.conn)
+            self.conn = None
+        self._copy_sqlite3_to_dest(shared.db_home, shared.db_office, checkpointed)
 
     def close(self):
         """
@@ -11,6 +11,8 @@ class TbotObserver(ABC):
     Abstract Class for Observe Pattern for Tbot
     """
 
+    __slots__ = ()
+
     @abstractmethod
     def open(self):
         """
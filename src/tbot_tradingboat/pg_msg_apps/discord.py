@@ -6,22 +6,28 @@ import json
 import os
 from typing import Dict
 import time
+from collections import deque
+from itertools import islice
 from datetime import datetime
-from json import dumps
-from dataclasses import dataclass
 
 from http.client import HTTPException
 from requests.exceptions import Timeout
 
-from requests import Response
+from requests import Response, Session
 from loguru import logger
+import orjson
 
 from discord_webhook import DiscordEmbed, DiscordWebhook
 from tbot_tradingboat.utils.constants import (
     TBOT_UPLOAD_LOGFILE_TIME_SEC,
     TBOT_UPLOAD_ERROR_TIME_SEC,
+    TBOT_MSG_APP_EVENTS_MAX,
+    TBOT_DISCORD_EMBEDS_MAX,
+    TBOT_DISCORD_BACKOFF_BASE_MS,
+    TBOT_DISCORD_BACKOFF_MAX_MS,
 )
 from tbot_tradingboat.utils.tbot_env import shared
+from tbot_tradingboat.utils.tbot_utils import json_dumps, now_ms
 from tbot_tradingboat.pg_decoder.tbot_observer import TbotObserver
 from tbot_tradingboat.pg_database.orderdb import TbotOrderDB
 from tbot_tradingboat.pg_database.errordb import TbotErrorDB
@@ -30,52 +36,80 @@ script_dir = os.path.dirname(__file__)
 logo_file_path = os.path.join(script_dir, "assets/genie_thumb.jpg")
 
 
-@dataclass
 class DiscordObserver(TbotObserver):
     """
     The Observer interface to send messages to Discord.
     """
 
-    color_buy = "A1DE01"
-    color_sell = "EA4514"
-    color_error = "C9385E"
-    color_logo = "FFFF00"
-    color_logfile = "36454F"
+    # Embed colors as the int Discord expects
+    color_buy = 0xA1DE01
+    color_sell = 0xEA4514
+    color_error = 0xC9385E
+    color_logo = 0xFFFF00
+    color_logfile = 0x36454F
 
     def __init__(self):
         """Initialize Discord Webhook"""
 
         self.webhook = None
-        self.new_events = []
+        # Keep-alive HTTPS connection to Discord reused by every post
+        self.session = None
+        # Oldest pending events are dropped once the bound is reached
+        self.new_events = deque(maxlen=TBOT_MSG_APP_EVENTS_MAX)
         self.orderdb = None
         self.errordb = None
         self.retry_after_ms = 0.0
+        # Circuit breaker for network failures (no HTTP response at all)
+        self.consec_failures = 0
+        self.cooldown_until_ms = 0
         self.log_start_sec = 0.0
         self.err_start_sec = 0.0
         self.last_order_ms = 0
         # Set the default time to read erros from database
-        self.last_err_ms = (time.time_ns() // 1000000) - (3600 * 1 * 1000)
+        self.last_err_ms = now_ms() - (3600 * 1 * 1000)
         # Show log filename in Discord Channel
         self.log_filename = "log.txt"
+        # Bytes of the log file already uploaded to Discord
+        self.log_offset = 0
+        self.logo_bytes = b""
         self.is_logo_uploaded = False
         # rate_limit_retry set to False in order to avoid time.sleep()
         if shared.discord_webhook:
             self.webhook = DiscordWebhook(
                 url=shared.discord_webhook, rate_limit_retry=False, timeout=3
             )
+            self.session = Session()
 
     def open(self):
         """Open the database"""
         if self.webhook:
+            with open(logo_file_path, "rb") as fobj:
+                self.logo_bytes = fobj.read()
             self.orderdb = TbotOrderDB()
             self.orderdb.setup_connection(shared.db_office)
             self.errordb = TbotErrorDB()
             self.errordb.setup_connection(shared.db_office)
 
+    def _webhook_post(self) -> Response:
+        """Posts the pending embeds/files like DiscordWebhook.api_post_request()"""
+        webhook = self.webhook
+        if webhook.files:
+            webhook.files["payload_json"] = (None, json_dumps(webhook.json))
+            return self.session.post(
+                webhook.url, files=webhook.files, timeout=webhook.timeout
+            )
+        return self.session.post(
+            webhook.url,
+            data=json_dumps(webhook.json),
+            headers={"Content-Type": "application/json"},
+            params={"wait": True},
+            timeout=webhook.timeout,
+        )
+
     def _webhook_excecute(self) -> Response:
         response = None
         try:
-            response = self.webhook.execute(remove_embeds=True)
+            response = self._webhook_post()
         except Timeout as err:
             logger.error(f"Timeout error while connecting to Discord: {err}")
         except HTTPException as err:
@@ -86,25 +120,54 @@ class DiscordObserver(TbotObserver):
             logger.error(f"JSON decoding error: {err}")
         except Exception as err:
             logger.error(f"Unexpected error while connecting to Discord: {err}")
+        # Never carry embeds over into the next message
+        self.webhook.remove_embeds()
 
-        if response:
-            logger.trace(f"status_code: {response.status_code}")
+        if response is None:
+            self.consec_failures += 1
+            backoff_ms = min(
+                TBOT_DISCORD_BACKOFF_MAX_MS,
+                TBOT_DISCORD_BACKOFF_BASE_MS * 2 ** min(self.consec_failures, 16),
+            )
+            self.cooldown_until_ms = now_ms() + backoff_ms
+            logger.warning(f"backing off Discord for {backoff_ms}ms")
+        elif response.status_code < 300:
+            self.consec_failures = 0
+
+        # Response is falsy for 4xx, so check against None
+        if response is not None:
+            logger.trace("status_code: {}", response.status_code)
             if response.status_code >= 200 and response.status_code < 300:
                 logger.success("It successfully sent the message to Discord.")
             elif response.status_code == 400:
                 logger.error("Invalid Embed type")
             elif response.status_code == 429:
                 try:
-                    errors = json.loads(response.content.decode("utf-8"))
+                    errors = orjson.loads(response.content)
                     _ = float(errors.get("retry_after", "0.0")) * 1e3 + 150
                     self.retry_after_ms = max(_, self.retry_after_ms)
-                except json.JSONDecodeError:
+                except orjson.JSONDecodeError:
                     logger.error("Ignoring invalid JSON content in the response")
             else:
                 logger.error(f"Unhandled HTTP status code: {response.status_code}")
         return response
 
-    def _send_msg(self, title: str, desc: str, color: str) -> Response:
+    @staticmethod
+    def _embed(title: str, desc: str, color: int, fields: Dict[str, str]) -> Dict:
+        """Builds the embed dict directly instead of a DiscordEmbed object"""
+        return {
+            "title": title,
+            "description": desc,
+            "color": color,
+            # Same format as DiscordEmbed.set_timestamp()
+            "timestamp": str(datetime.utcnow()),
+            "fields": [
+                {"name": name, "value": value, "inline": True}
+                for name, value in fields.items()
+            ],
+        }
+
+    def _send_msg(self, title: str, desc: str, color: int) -> Response:
         """Sends order messages to Discord"""
         embed = DiscordEmbed(title=title, description=desc, color=color)
         embed.set_timestamp()
@@ -113,28 +176,38 @@ class DiscordObserver(TbotObserver):
         return response
 
     def send_order(self) -> Response:
-        """Send an order message"""
+        """
+        Send order messages, batching pending events into one request
+
+        As with one event per call, the order reported for each consumed
+        event is the one of the event consumed before it (last_order_ms).
+        """
         response = None
-        row = self.orderdb.find_order_by_unique_key(self.last_order_ms)
-        if row:
+        count = min(len(self.new_events), TBOT_DISCORD_EMBEDS_MAX)
+        keys = [self.last_order_ms, *islice(self.new_events, count - 1)]
+        rows = self.orderdb.find_orders_by_unique_keys(keys)
+        for row in rows:
             title = (
                 f"{row['ticker']} {row['action']} {row['qty']} on #{shared.client_id}"
             )
-            logger.debug(f"sending order ${row}")
+            logger.debug("sending order {}", row)
             color = self.color_buy if row["action"] == "BUY" else self.color_sell
-            embed = DiscordEmbed(title=title, description=dumps(row), color=color)
-            embed.set_timestamp()
-            embed.add_embed_field(name="ACTION", value=row["action"])
-            embed.add_embed_field(name="TICKER", value=row["ticker"])
-            embed.add_embed_field(name="QTY", value=str(row["qty"]))
-            self.webhook.add_embed(embed)
+            fields = {
+                "ACTION": row["action"],
+                "TICKER": row["ticker"],
+                "QTY": str(row["qty"]),
+            }
+            self.webhook.add_embed(self._embed(title, json_dumps(row), color, fields))
+        if rows:
             response = self._webhook_excecute()
-            if response and response.status_code != 429:
-                self.last_order_ms = self.new_events.pop(0)
+            if response is None or response.status_code == 429:
+                # Keep the events for the next tick
+                return response
         else:
-            # We have a new webhook but it might be cancled by the decoder
+            # We have new webhooks but they might be cancled by the decoder
             logger.trace("no order to send")
-            self.last_order_ms = self.new_events.pop(0)
+        for _ in range(count):
+            self.last_order_ms = self.new_events.popleft()
         return response
 
     def send_error(self) -> Response:
@@ -142,17 +215,20 @@ class DiscordObserver(TbotObserver):
         response = None
         row = self.errordb.find_error_by_uniquekey(self.last_err_ms)
         if row:
-            logger.debug(f"sending error ${row}")
+            logger.debug("sending error {}", row)
             title = f"Error on Tradingboat #{shared.client_id}"
-            embed = DiscordEmbed(title=title, description="", color=self.color_error)
-            embed.set_timestamp()
-            embed.add_embed_field(name="ERRCODE", value=str(row["errcode"]))
-            embed.add_embed_field(name="ERRSTR", value=row["errstr"])
-            embed.add_embed_field(name="SYMBOL", value=row["symbol"])
-            self.webhook.add_embed(embed)
+            fields = {
+                "ERRCODE": str(row["errcode"]),
+                "ERRSTR": row["errstr"],
+                "SYMBOL": row["symbol"],
+            }
+            self.webhook.add_embed(
+                self._embed(title, "", self.color_error, fields)
+            )
             response = self._webhook_excecute()
             if response and response.status_code != 429:
-                dt_obj = datetime.strptime(row["timestamp"], "%Y-%m-%d %H:%M:%S.%f")
+                # SQLite's '%Y-%m-%d %H:%M:%f' is ISO 8601, no need for strptime()
+                dt_obj = datetime.fromisoformat(row["timestamp"])
                 self.last_err_ms = dt_obj.timestamp() * 1000
         else:
             logger.trace("no error to send")
@@ -160,8 +236,7 @@ class DiscordObserver(TbotObserver):
 
     def send_logo_file(self):
         """Send a logo file"""
-        with open(logo_file_path, "rb") as fobj:
-            self.webhook.add_file(file=fobj.read(), filename="genie.jpg")
+        self.webhook.add_file(file=self.logo_bytes, filename="genie.jpg")
         title = f"Welcome to Tbot on Tradingboat #{shared.client_id}"
         embed = DiscordEmbed(title=title, description="", color=self.color_logo)
         embed.set_thumbnail(url="attachment://genie.jpg")
@@ -177,14 +252,25 @@ class DiscordObserver(TbotObserver):
             logger.error("there is no log file to upload")
             return
         try:
+            with open(file_path, "rb") as fobj:
+                size = os.fstat(fobj.fileno()).st_size
+                if size < self.log_offset:
+                    # loguru rotated the file
+                    self.log_offset = 0
+                if size == self.log_offset:
+                    logger.trace("no new log to upload")
+                    return
+                fobj.seek(self.log_offset)
+                log_bytes = fobj.read(size - self.log_offset)
             title = f"Log on Tradingboat #{shared.client_id}"
             embed = DiscordEmbed(title=title, description="", color=self.color_logfile)
             embed.set_thumbnail(url="attachment://genie.jpg")
             embed.set_timestamp()
             self.webhook.add_embed(embed)
-            with open(file_path, "rb") as fobj:
-                self.webhook.add_file(file=fobj.read(), filename=self.log_filename)
-            self._webhook_excecute()
+            self.webhook.add_file(file=log_bytes, filename=self.log_filename)
+            response = self._webhook_excecute()
+            if response and response.status_code < 300:
+                self.log_offset = size
             self.webhook.remove_files()
             self.webhook.remove_embeds()
         except Exception as err:
@@ -200,6 +286,8 @@ class DiscordObserver(TbotObserver):
             return
         if data_dict:
             self.new_events.append(tbot_ts)
+        elif now_ms() < self.cooldown_until_ms:
+            logger.trace("Discord is cooling down after connection failures")
         else:
             if not self.is_logo_uploaded:
                 self.send_logo_file()
@@ -228,3 +316,5 @@ class DiscordObserver(TbotObserver):
             self.orderdb.close()
         if self.errordb:
             self.errordb.close()
+        if self.session:
+            self.session.close()
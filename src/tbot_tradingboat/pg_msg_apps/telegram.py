@@ -4,10 +4,9 @@ TradingBoat © Copyright, Plusgenie Limited 2023. All Rights Reserved.
 """
 from typing import Dict
 import time
+from collections import deque
 from datetime import datetime
-from dataclasses import dataclass
 
-from json import dumps
 from http.client import HTTPException
 from loguru import logger
 
@@ -17,11 +16,14 @@ from telegram.error import TimedOut, TelegramError
 from tbot_tradingboat.pg_decoder.tbot_observer import TbotObserver
 from tbot_tradingboat.pg_database.orderdb import TbotOrderDB
 from tbot_tradingboat.pg_database.errordb import TbotErrorDB
-from tbot_tradingboat.utils.constants import TBOT_UPLOAD_ERROR_TIME_SEC
+from tbot_tradingboat.utils.constants import (
+    TBOT_UPLOAD_ERROR_TIME_SEC,
+    TBOT_MSG_APP_EVENTS_MAX,
+)
 from tbot_tradingboat.utils.tbot_env import shared
+from tbot_tradingboat.utils.tbot_utils import json_dumps, now_ms
 
 
-@dataclass
 class TelegramObserver(TbotObserver):
     """
     The Observer interface to send messages to Telegram.
@@ -31,14 +33,15 @@ class TelegramObserver(TbotObserver):
         """Initialize Telegram bot"""
 
         self.bot = None
-        self.new_events = []
+        # Oldest pending events are dropped once the bound is reached
+        self.new_events = deque(maxlen=TBOT_MSG_APP_EVENTS_MAX)
         self.orderdb = None
         self.errordb = None
         self.log_start_sec = 0
         self.err_start_sec = 0
         self.last_order_ms = 0
         # Set the default time to read erros from database
-        self.last_err_ms = (time.time_ns() // 1000000) - (3600 * 1 * 1000)
+        self.last_err_ms = now_ms() - (3600 * 1 * 1000)
         if shared.telegram_token and shared.telegram_chat_id:
             self.bot = Bot(token=shared.telegram_token)
 
@@ -56,7 +59,10 @@ class TelegramObserver(TbotObserver):
         body = title + msg
         data = None
         try:
-            data = self.bot.send_message(chat_id=shared.telegram_chat_id, text=body)
+            # Bound the blocking call like the Discord webhook (timeout=3)
+            data = self.bot.send_message(
+                chat_id=shared.telegram_chat_id, text=body, timeout=3
+            )
         except TimedOut as err:
             logger.error(f"Telegram request timed out: {err}")
         except HTTPException as err:
@@ -70,11 +76,12 @@ class TelegramObserver(TbotObserver):
         """Send error message"""
         row = self.errordb.find_error_by_uniquekey(self.last_err_ms)
         if row:
-            logger.debug(f"sending error ${row}")
-            msg = dumps(row)
+            logger.debug("sending error {}", row)
+            msg = json_dumps(row)
             title = f"{row['errcode']} {row['errstr']} {row['symbol']}"
             self._send_msg(title, msg)
-            dt_obj = datetime.strptime(row["timestamp"], "%Y-%m-%d %H:%M:%S.%f")
+            # SQLite's '%Y-%m-%d %H:%M:%f' is ISO 8601, no need for strptime()
+            dt_obj = datetime.fromisoformat(row["timestamp"])
             self.last_err_ms = dt_obj.timestamp() * 1000
 
     def send_order(self):
@@ -84,7 +91,7 @@ class TelegramObserver(TbotObserver):
             title = (
                 f"{row['ticker']} {row['action']} {row['qty']} on #{shared.client_id}"
             )
-            msg = dumps(row)
+            msg = json_dumps(row)
             self._send_msg(title, msg)
 
     def update(self, caller=None, tbot_ts: str = "", data_dict: Dict = None, **kwargs):
@@ -103,7 +110,7 @@ class TelegramObserver(TbotObserver):
                 self.send_errors()
 
             if len(self.new_events) > 0:
-                self.last_order_ms = self.new_events.pop(0)
+                self.last_order_ms = self.new_events.popleft()
                 self.send_order()
 
     def close(self):
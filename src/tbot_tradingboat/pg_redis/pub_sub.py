@@ -8,20 +8,18 @@ __copyright__ = "Copyright (C) 2023 Plusgenie Ltd"
 __license__ = "Dual-Licensing (GPL or Commercial License)"
 
 
-import time
-import json
 from typing import Tuple
-from dataclasses import dataclass
 
+import orjson
 import redis
 from loguru import logger
 
 from tbot_tradingboat.utils.tbot_env import shared
+from tbot_tradingboat.utils.tbot_utils import now_ms
 from .valid_timestamp import RedisMessageValidator
 from .listener import TbotListener
 
 
-@dataclass
 class TbotSub(TbotListener):
     """
     Suscriber as Redis PubSub
@@ -42,31 +40,39 @@ class TbotSub(TbotListener):
         """Placeholder for Open"""
         logger.trace("open")
 
+    def _create_pool(self) -> redis.ConnectionPool:
+        """Creates the connection pool for the pubsub connection and a spare"""
+        tcp = {
+            "host": shared.r_host,
+            "port": int(shared.r_port),
+            "password": shared.r_passwd,
+            "decode_responses": False,
+            "retry_on_timeout": True,
+            "max_connections": 2,
+        }
+        unix = {
+            "password": shared.r_passwd,
+            "decode_responses": False,
+            "retry_on_timeout": True,
+            "max_connections": 2,
+        }
+        if shared.r_host:
+            return redis.ConnectionPool(**tcp)
+        redis_url = f"unix://{shared.r_host_unix}"
+        return redis.ConnectionPool.from_url(redis_url, **unix)
+
     def connect(self) -> bool:
         """Connects to Redis Channel"""
         try:
-            tcp = {
-                "host": shared.r_host,
-                "port": int(shared.r_port),
-                "password": shared.r_passwd,
-                "decode_responses": True,
-                "retry_on_timeout": True,
-                "max_connections": 10,
-            }
-            unix = {
-                "password": shared.r_passwd,
-                "decode_responses": True,
-                "retry_on_timeout": True,
-                "max_connections": 10,
-            }
-            if shared.r_host:
-                self.pool = redis.ConnectionPool(**tcp)
-            else:
-                redis_url = f"unix://{shared.r_host_unix}"
-                self.pool = redis.ConnectionPool.from_url(redis_url, **unix)
-
-            logger.debug(f"connecting to Redis:{self.pool}")
-            self.dbase = redis.Redis(connection_pool=self.pool)
+            # The pool outlives reconnects; pubsub holds one dedicated connection
+            if self.pool is None:
+                self.pool = self._create_pool()
+                logger.debug(f"connecting to Redis:{self.pool}")
+                self.dbase = redis.Redis(connection_pool=self.pool)
+            if self.chan_conn:
+                # Release the broken connection back to the pool
+                self.chan_conn.close()
+                self.chan_conn = None
             # not interested in the (sometimes noisy) subscribe/unsubscribe
             self.chan_conn = self.dbase.pubsub(ignore_subscribe_messages=True)
             self.chan_conn.subscribe(self.r_channel)
@@ -89,10 +95,11 @@ class TbotSub(TbotListener):
         message (_type_): a message from Redis PubSub channel
         """
         # 'data' is the fixed property of redis's pubsub message
+        # It stays as raw bytes (decode_responses=False) for orjson
         msg = msg.get("data")
         ret = None
         if msg:
-            data_dict = json.loads(msg)
+            data_dict = orjson.loads(msg)
             ret = self.validts.validate_message(data_dict)
         return ret
 
@@ -113,8 +120,8 @@ class TbotSub(TbotListener):
         if msg:
             validated_message = self.validate_message(msg)
             if validated_message:
-                logger.debug(f"[Received validated message]: {validated_message}")
-                id_stream = str(time.time_ns() // 1000000)
+                logger.debug("[Received validated message]: {}", validated_message)
+                id_stream = str(now_ms())
             else:
                 logger.warning(f"Detecting invalid stream: {msg}")
         return id_stream, validated_message, None
@@ -123,10 +130,13 @@ class TbotSub(TbotListener):
         """
         Deletes a Redis pub/sub
         """
-        logger.trace(f"Deleting Redis message: {id_stream}")
+        logger.trace("Deleting Redis message: {}", id_stream)
 
     def close(self):
         """Closes connection to Redis"""
         if self.chan_conn:
             self.chan_conn.unsubscribe()
+            self.chan_conn.close()
             self.chan_conn = None
+        if self.pool:
+            self.pool.disconnect()
@@ -8,21 +8,32 @@ __copyright__ = "Copyright (C) 2023 Plusgenie Ltd"
 __license__ = "Dual-Licensing (GPL or Commercial License)"
 
 
-import json
-from typing import Tuple, Union
-from dataclasses import dataclass
+from collections import deque
+from typing import Deque, Dict, Tuple, Union
 
+import orjson
 import redis
 from loguru import logger
 
 from tbot_tradingboat.utils.tbot_env import shared
+from tbot_tradingboat.utils.constants import TBOT_REDIS_XREAD_COUNT
+from tbot_tradingboat.utils.tbot_utils import strtobool
 from tbot_tradingboat.pg_decoder.ib_api.tbot_api import mark
 
 from .valid_timestamp import RedisMessageValidator
 from .listener import TbotListener
 
+# Redis settings are fixed once the .env file is loaded
+_R_HOST = shared.r_host
+_R_PORT = int(shared.r_port)
+_R_PASSWD = shared.r_passwd
+_R_HOST_UNIX = shared.r_host_unix
+_READ_TIMEOUT_MS = max(int(shared.r_read_timeout_ms), 1)
+_SINGLE_CONN = strtobool(shared.r_single_conn)
+# XREAD/XDEL are serial; a pipeline in delete_all() needs the second slot
+_MAX_CONNECTIONS = 2 if _SINGLE_CONN else 10
+
 
-@dataclass
 class TbotStream(TbotListener):
     """
     Suscriber as Redis Stream
@@ -38,8 +49,20 @@ class TbotStream(TbotListener):
         self.id_last = 0
         self.r_skey = self.REDIS_STREAM_KEY + shared.client_id
         self.r_tb_key = self.REDIS_STREAM_TB_KEY
+        # Encoded once: redis-py sends bytes as-is instead of encoding per call
+        self._r_skey_b = self.r_skey.encode()
+        # XREAD argument reused across calls, the cursor is updated in place
+        self._stream_arg = {self._r_skey_b: "0"}
+        # Field name as returned by XREAD with decode_responses=False
+        self.r_tb_field = self.r_tb_key.encode("ascii")
+        # Validated entries of the last XREAD batch, not yet dispatched
+        self._pending: Deque[Tuple[str, dict, bytes]] = deque()
+        # Entries handed to observers but not deleted yet -> their timestamps
+        self._unacked: Dict[bytes, object] = {}
+        self._xread = None
+        self._xdel = None
         self.pool = None
-        self.r_read_timeout_ms = max(int(shared.r_read_timeout_ms), 1)
+        self.r_read_timeout_ms = _READ_TIMEOUT_MS
 
     def open(self):
         """Placeholder for Open"""
@@ -55,30 +78,38 @@ class TbotStream(TbotListener):
         """
         try:
             self.id_last = 0
+            # Undeleted entries are read again from the new connection
+            self._pending.clear()
+            self._unacked.clear()
             tcp = {
-                "host": shared.r_host,
-                "port": int(shared.r_port),
-                "password": shared.r_passwd,
-                "decode_responses": True,
+                "host": _R_HOST,
+                "port": _R_PORT,
+                "password": _R_PASSWD,
+                "decode_responses": False,
                 "retry_on_timeout": True,
-                "max_connections": 10,
+                "max_connections": _MAX_CONNECTIONS,
             }
             unix = {
-                "password": shared.r_passwd,
-                "decode_responses": True,
+                "password": _R_PASSWD,
+                "decode_responses": False,
                 "retry_on_timeout": True,
-                "max_connections": 10,
+                "max_connections": _MAX_CONNECTIONS,
             }
-            if shared.r_host:
+            if _R_HOST:
                 self.pool = redis.ConnectionPool(**tcp)
-                conn_msg = f"Redis TCP: {shared.r_host}:{shared.r_port}"
+                conn_msg = f"Redis TCP: {_R_HOST}:{_R_PORT}"
             else:
-                redis_url = f"unix://{shared.r_host_unix}"
+                redis_url = f"unix://{_R_HOST_UNIX}"
                 self.pool = redis.ConnectionPool.from_url(redis_url, **unix)
-                conn_msg = f"Redis Unix Socket: {shared.r_host_unix}"
+                conn_msg = f"Redis Unix Socket: {_R_HOST_UNIX}"
 
             logger.debug(f"connecting to Redis:{self.pool}")
-            self.dbase = redis.Redis(connection_pool=self.pool)
+            self.dbase = redis.Redis(
+                connection_pool=self.pool, single_connection_client=_SINGLE_CONN
+            )
+            # Bound commands used on every event
+            self._xread = self.dbase.xread
+            self._xdel = self.dbase.xdel
 
             logger.success(
                 f"Connected successfully to {conn_msg}"
@@ -100,20 +131,22 @@ class TbotStream(TbotListener):
         Returns None if this is not valid pubsub messsage against JSON schema
         message: the encoded TradingView value in the 'decoded' Redis stream
         """
-        if self.r_tb_key not in msg:
+        payload = msg.get(self.r_tb_field)
+        if payload is None:
             logger.warning(f"No '{self.r_tb_key}' key found in message: {msg}")
             return None
-        data_dict = json.loads(msg[self.r_tb_key])
-        return self.validts.validate_message(data_dict)
+        data_dict = orjson.loads(payload)
+        # Duplicated timestamps are checked on delivery, see _hand_out()
+        return self.validts.validate_message(data_dict, check_duplicates=False)
 
     @mark
-    def handle_event(self, caller) -> Tuple[str, str, str]:
+    def handle_event(self, caller) -> Tuple[str, str, bytes]:
         """
         Vadidates the message and then dispatch it to observers
-        Assumes that the decoded channel is being used
+        Stream entries arrive as bytes; only the stream id is decoded
         count
             None: receive the newest
-            1   : receive one stream from the earlist available
+            N   : receive up to N streams after the last read id
         block
             None: non-blocking
             0   : blocking
@@ -122,10 +155,17 @@ class TbotStream(TbotListener):
         if not self.dbase:
             return None, None, None
 
-        id_stream, validated_message, id_curr = None, None, None
-        earliest, count, block = ("0-0", 1, self.r_read_timeout_ms)
+        if self._pending:
+            return self._hand_out()
+
+        if self._unacked:
+            # An observer kept an entry (e.g. IB was down): scan it again
+            self._unacked.clear()
+            self.id_last = 0
+        self._stream_arg[self._r_skey_b] = self.id_last or "0"
+        count, block = (TBOT_REDIS_XREAD_COUNT, self.r_read_timeout_ms)
         try:
-            data = self.dbase.xread({self.r_skey: earliest}, count, block)
+            data = self._xread(self._stream_arg, count, block)
         except UnicodeDecodeError as err:
             logger.critical(f"UnicodeDecodeError: {err}")
             self.delete_all()
@@ -138,23 +178,41 @@ class TbotStream(TbotListener):
 
         if data:
             first_stream = data[0]
-            fs_data_arr = first_stream[1]
-            (id_curr, msg) = fs_data_arr[0]
-            logger.trace(f"Received new stream ID: {id_curr}")
-            validated_message = self.validate_message(msg)
-
-            if validated_message:
-                logger.debug(f"[Received validated message]: {validated_message}")
-                # Get the timestamp from the Stream id of Redis
-                id_stream = id_curr.split("-")[0]
-                if id_curr == self.id_last:
-                    logger.error(f"Received data but not consumed: {id_curr}")
-            else:
-                logger.warning(f"Deleting invalid stream: {id_curr}")
-                self.delete(id_curr)
-            # Update the next stream ID
-            self.id_last = id_curr
-        return id_stream, validated_message, id_curr
+            for id_curr, msg in first_stream[1]:
+                logger.trace("Received new stream ID: {}", id_curr)
+                validated_message = self.validate_message(msg)
+
+                if validated_message:
+                    logger.debug("[Received validated message]: {}", validated_message)
+                    # Get the timestamp from the Stream id of Redis
+                    id_stream = id_curr.partition(b"-")[0].decode()
+                    self._pending.append((id_stream, validated_message, id_curr))
+                else:
+                    logger.warning(f"Deleting invalid stream: {id_curr}")
+                    self.delete(id_curr)
+                # Update the next stream ID
+                self.id_last = id_curr
+        return self._hand_out()
+
+    def _hand_out(self) -> Tuple[str, dict, bytes]:
+        """
+        Pops the next validated entry and tracks it until it is deleted
+
+        Duplicated timestamps are checked here rather than when the batch is
+        read, and recorded only once the entry is deleted (consumed). Entries
+        dropped from _pending/_unacked on reconnect or rescan are read again
+        and must not be taken for replays of themselves.
+        """
+        while self._pending:
+            entry = self._pending.popleft()
+            _ts = entry[1].get("timestamp")
+            if self.validts.is_duplicated_ts(_ts):
+                logger.warning(f"Deleting duplicated stream: {entry[2]}")
+                self.delete(entry[2])
+                continue
+            self._unacked[entry[2]] = _ts
+            return entry
+        return None, None, None
 
     def delete(self, redis_msg_id: Union[str, bytes]) -> None:
         """
@@ -166,21 +224,35 @@ class TbotStream(TbotListener):
 
         if isinstance(redis_msg_id, str):
             redis_msg_id = redis_msg_id.encode(encoding="UTF-8")
-        logger.debug(f"Deleting Redis stream id: {redis_msg_id}")
-        deleted_count = self.dbase.xdel(self.r_skey, redis_msg_id)
+        if redis_msg_id in self._unacked:
+            # Consumed by an observer: later replays are duplicates
+            self.validts.record_ts(self._unacked.pop(redis_msg_id))
+        logger.debug("Deleting Redis stream id: {}", redis_msg_id)
+        deleted_count = self._xdel(self._r_skey_b, redis_msg_id)
         if deleted_count == 1:
-            logger.debug(f"Stream with ID {redis_msg_id.decode()} has been deleted.")
+            logger.opt(lazy=True).debug(
+                "Stream with ID {} has been deleted.", redis_msg_id.decode
+            )
         else:
-            logger.debug(f"No stream found with ID {redis_msg_id.decode()}.")
+            logger.opt(lazy=True).debug(
+                "No stream found with ID {}.", redis_msg_id.decode
+            )
 
     def delete_all(self):
         """Delete all redis stream with Tradingboat channel"""
+        flush_ops = 1000
         chan = self.dbase.xread(streams={self.r_skey: 0})
+        pipe = self.dbase.pipeline(transaction=False)
         for streams in chan:
             stream_name, messages = streams
-            # Delete all ids from the message list
+            # Delete all ids from the message list in batches
             for i in messages:
-                self.dbase.xdel(stream_name, i[0])
+                pipe.xdel(stream_name, i[0])
+                if len(pipe) >= flush_ops:
+                    pipe.execute()
+        pipe.execute()
+        self._pending.clear()
+        self._unacked.clear()
 
     def close(self):
         """Closes Redis connection"""
@@ -9,7 +9,8 @@ from pathlib import Path
 from typing import Dict
 from dataclasses import dataclass
 
-import json
+import orjson
+import fastjsonschema
 import jsonschema
 from loguru import logger
 
@@ -30,9 +31,13 @@ class RedisMessageValidator:
 
     def __init__(self):
         """Initialize a subscriber to Redis"""
+        # Two generations of timestamps: lookups check both, inserts go to
+        # the active one, and a full active set retires the older one.
         self.set_ts = set()
+        self.set_ts_prev = set()
         self.set_size = 10000
         self.schema = None
+        self.validator = None
         self.duplicated_ts = strtobool(shared.duplicated_ts)
         self.load_json_schema()
 
@@ -40,50 +45,63 @@ class RedisMessageValidator:
         """Loads the JSON schema for Tradingview's JSON format"""
         path = Path(__file__).parent / RedisMessageValidator.TBOT_JSON_SCHEMA
         logger.trace(f"Schema: {path}")
-        with path.open() as user_file:
-            self.schema = json.loads(user_file.read())
+        self.schema = orjson.loads(path.read_bytes())
+        # jsonschema reports errors in the schema itself (SchemaError)
+        jsonschema.validators.validator_for(self.schema).check_schema(self.schema)
+        # fastjsonschema generates the code that validates each message
+        self.validator = fastjsonschema.compile(self.schema)
 
     def is_valid_json_schema(self, data_dict: Dict) -> bool:
         """Validates Tradingview's JSON format"""
-        if not self.schema:
-            logger.error("Failed to load the schema")
-            return False
         ret = False
         try:
-            jsonschema.validate(data_dict, self.schema)
+            self.validator(data_dict)
             logger.trace("Schema validation successful")
             ret = True
-        except jsonschema.SchemaError as err:
-            logger.error(f"Schema validation failed {err}")
-        except jsonschema.ValidationError as err:
-            logger.error(err)
+        except fastjsonschema.JsonSchemaValueException as err:
+            logger.error(f"Schema validation failed: {err.message}")
         except BaseException as err:
             logger.error(err)
         return ret
 
-    def validate_message(self, data_dict=None) -> dict:
+    def is_duplicated_ts(self, _ts) -> bool:
+        """Returns True if the timestamp belongs to an already consumed message"""
+        if self.duplicated_ts and (_ts in self.set_ts or _ts in self.set_ts_prev):
+            logger.info(f"Ignoring duplicated msgs with timestamp: {_ts}")
+            return True
+        return False
+
+    def record_ts(self, _ts):
+        """Records the timestamp of a consumed message"""
+        if not self.duplicated_ts:
+            return
+        # Add the timestamp set
+        self.set_ts.add(_ts)
+        #  Rotate the timestamp sets
+        if len(self.set_ts) > self.set_size:
+            logger.debug("rotating timestamp set")
+            self.set_ts_prev = self.set_ts
+            self.set_ts = set()
+
+    def validate_message(self, data_dict=None, check_duplicates: bool = True) -> dict:
         """
         Validate message w.r.t JSON schema and timestamp duplications
 
         data_dict: the message that has timestamp from Tradingview
+        check_duplicates: False if the caller checks duplications itself
+            with is_duplicated_ts()/record_ts() when the message is delivered
         """
         if data_dict and not self.is_valid_json_schema(data_dict):
             return None
         ret = data_dict
         if self.duplicated_ts:
-            if data_dict.get("timestamp"):
-                _ts = data_dict["timestamp"]
-                if _ts in self.set_ts:
-                    logger.info(f"Ignoring duplicated msgs with timestamp: {_ts}")
+            _ts = data_dict.get("timestamp")
+            if not _ts:
+                logger.error(f"message formattimestamp is missing: {data_dict}")
+                ret = None
+            elif check_duplicates:
+                if self.is_duplicated_ts(_ts):
                     ret = None
                 else:
-                    # Add the timestamp set
-                    self.set_ts.add(_ts)
-            else:
-                logger.error(f"message formattimestamp is missing: {_ts}")
-                ret = None
-            #  Delete the timestamp set
-            if len(self.set_ts) > self.set_size:
-                logger.debug("clearing timestamp set")
-                self.set_ts.clear()
+                    self.record_ts(_ts)
         return ret
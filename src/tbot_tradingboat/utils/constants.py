@@ -6,5 +6,19 @@ This file holds NamedTuple to hold data for TBOT
 """
 
 TBOT_PUT_REDIS_EVENT_SLEEP_SEC = 0.02
+# Redis stream entries fetched per XREAD
+TBOT_REDIS_XREAD_COUNT = 32
 TBOT_UPLOAD_LOGFILE_TIME_SEC = 3600.0
 TBOT_UPLOAD_ERROR_TIME_SEC = 120.0
+# Interval of the watchdog's Redis ping while idle
+TBOT_WATCHDOG_PING_SEC = 1800.0
+TBOT_ACCOUNT_FUNDS_TTL_SEC = 0.5
+TBOT_ALERT_BATCH_MAX = 64
+# Longest time an alert waits in the queue, whether IB is connected or not
+TBOT_ALERT_FLUSH_MS = 1000
+TBOT_MSG_APP_EVENTS_MAX = 1024
+# Discord accepts up to 10 embeds per webhook message
+TBOT_DISCORD_EMBEDS_MAX = 10
+# Backoff after consecutive Discord connection failures
+TBOT_DISCORD_BACKOFF_BASE_MS = 250
+TBOT_DISCORD_BACKOFF_MAX_MS = 30000
@@ -4,12 +4,22 @@ TradingBoat © Copyright, Plusgenie Limited 2023. All Rights Reserved.
 """
 import os
 import json
+from typing import Optional
 
-from requests import get
+import requests
 
 TOKEN = os.environ.get("TBOT_TELEGRAM_TOKEN", "")
 
 url = f"https://api.telegram.org/bot{TOKEN}/getUpdates"
 
-data = get(url, timeout=10).json()
-print(json.dumps(data, indent=4))
+
+def get_updates(session: Optional[requests.Session] = None) -> dict:
+    """Returns getUpdates of the bot, reusing the session's connection if given"""
+    if session is None:
+        with requests.Session() as new_session:
+            return new_session.get(url, timeout=10).json()
+    return session.get(url, timeout=10).json()
+
+
+if __name__ == "__main__":
+    print(json.dumps(get_updates(), indent=4))
@@ -5,16 +5,22 @@ TradingBoat © Copyright, Plusgenie Limited 2023. All Rights Reserved.
 This file holds NamedTuple to hold data for TBOT
 """
 import os
+import sys
 from typing import NamedTuple
 from dataclasses import dataclass, field
-from functools import partial, lru_cache
+from functools import partial
 from enum import Enum
 
+# dataclass(slots=True) is only available from Python 3.10
+DATACLASS_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
 
-@dataclass(frozen=True)
+
+@dataclass(frozen=True, **DATACLASS_SLOTS)
 class EnvSettings:
     """
     Create NamedTuple to read Environment Values
+
+    Instantiate once: tbot_env.shared is the instance shared by all modules
     """
 
     # ---------------------------------
@@ -51,6 +57,9 @@ class EnvSettings:
     r_read_timeout_ms: str = field(
         default_factory=partial(os.environ.get, "TBOT_REDIS_READ_TIMEOUT_MS", "40")
     )
+    r_single_conn: str = field(
+        default_factory=partial(os.environ.get, "TBOT_REDIS_SINGLE_CONN", "False")
+    )
     # ---------------------------------
     # SQLite3 Database
     # ---------------------------------
@@ -64,6 +73,10 @@ class EnvSettings:
             os.environ.get, "TBOT_DB_OFFICE", "/home/tbot/tbot_sqlite3"
         )
     )
+    # Dump the latest rows of the alert table after each flush (debugging only)
+    db_display: str = field(
+        default_factory=partial(os.environ.get, "TBOT_DB_DISPLAY", "False")
+    )
     # ---------------------------------
     # Messaging Apps: Discord
     # ---------------------------------
@@ -120,10 +133,6 @@ class EnvSettings:
         default_factory=partial(os.environ.get, "TBOT_PROFILER", "False")
     )
 
-    @lru_cache
-    def __new__(cls) -> object:
-        return super().__new__(cls)
-
 
 class PnL2Contract(NamedTuple):
     """
@@ -157,9 +166,10 @@ class OrderTV(NamedTuple):
     tif: str
 
 
-class OrderDBInfo(NamedTuple):
+@dataclass(frozen=True, **DATACLASS_SLOTS)
+class OrderDBInfo:
     """
-    Create NamedTuple for save results of placing orders to IB/TWS
+    Create slotted dataclass for save results of placing orders to IB/TWS
     """
 
     tvPrice: float
@@ -178,10 +188,10 @@ class OrderDBInfo(NamedTuple):
     position: int = 0
 
 
-class AlertDBInfo(NamedTuple):
+@dataclass(frozen=True, **DATACLASS_SLOTS)
+class AlertDBInfo:
     """
-    Create NamedTuple for save webhook received from TradingView
-
+    Create slotted dataclass for save webhook received from TradingView
     """
 
     timestamp: str
@@ -198,9 +208,10 @@ class AlertDBInfo(NamedTuple):
     tv_price: float = 0.0
 
 
-class ErrorDBInfo(NamedTuple):
+@dataclass(frozen=True, **DATACLASS_SLOTS)
+class ErrorDBInfo:
     """
-    Create NamedTuple for save error message to report to a remote server
+    Create slotted dataclass for save error message to report to a remote server
     """
 
     unique: str
@@ -219,7 +230,8 @@ class OrderKey(NamedTuple):
     orderRef: str = "notUsed"
 
 
-class OrderKeyEx(NamedTuple):
+@dataclass(frozen=True, **DATACLASS_SLOTS)
+class OrderKeyEx:
     """
     Create Key to search fields from Order Database
     """
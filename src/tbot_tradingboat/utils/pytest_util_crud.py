@@ -9,16 +9,19 @@ __license__ = "Dual-Licensing (GPL or Commercial License)"
 
 
 import asyncio
-import json
+import atexit
 import os
 import sys
 import ssl
 
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from hashlib import md5
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple, Union
 from enum import Enum
 
 import aiohttp
+import orjson
 
 from dotenv import load_dotenv
 from loguru import logger
@@ -28,6 +31,7 @@ from tbot_tradingboat.pg_database.alertdb import TbotAlertDB
 
 from tbot_tradingboat.pg_decoder.ib_api.tbot_api import get_ordref_ex
 from tbot_tradingboat.utils.objects import OrderKey, OrderKeyEx
+from tbot_tradingboat.utils.tbot_utils import json_dumps
 
 # Set the default path to the .env file in the user's home directory
 DEFAULT_ENV_FILE_PATH = os.path.expanduser("~/.env")
@@ -47,6 +51,20 @@ WEBSERVER = os.environ.get("TBOT_PYTEST_IPADDR", "http://localhost:5000/webhook"
 UNIQUE_KEY = os.environ.get("TVWB_UNIQUE_KEY", "").strip()
 TBOT_TVWB_EVENT = "WebhookReceived"
 CLIENT_ID = int(os.environ.get("TBOT_IBKR_CLIENTID", "1").strip())
+# Replayed messages repeat the same (timeframe, orderRef) pairs
+cached_ordref_ex = lru_cache(maxsize=1024)(get_ordref_ex)
+# Metric names of TradingView's webhook -> keyword arguments of update_tvmsg_data
+TBOT_METRIC_KWARGS = {
+    "entry.limit": "entry_limit",
+    "entry.stop": "entry_stop",
+    "exit.limit": "exit_limit",
+    "exit.stop": "exit_stop",
+}
+# Webhook key expected by TVWB, derived from module constants only
+TBOT_TVWB_EVENT_KEY = (
+    f"{TBOT_TVWB_EVENT}:"
+    f"{md5((TBOT_TVWB_EVENT + UNIQUE_KEY).encode()).hexdigest()[:6]}"
+)
 
 
 class DatabaseType(Enum):
@@ -62,53 +80,132 @@ class DatabaseType(Enum):
     ALERT_DB = "alertdb"
 
 
-async def send_webhook(json_list: List, delay: float = 0.0) -> None:
+# Certificate validation is off for the test webhook server; built once per process
+_SSL_CTX = ssl.SSLContext(ssl.PROTOCOL_TLS)
+_SSL_CTX.verify_mode = ssl.CERT_NONE
+_SESSION: Optional[aiohttp.ClientSession] = None
+_SESSION_LOOP: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _discard_session() -> None:
+    """
+    Closes the shared session outside of its own event loop, e.g. when a
+    new loop asks for a session or at interpreter exit.
+    """
+    global _SESSION, _SESSION_LOOP
+    if _SESSION is not None and not _SESSION.closed:
+        if not _SESSION_LOOP.is_closed() and not _SESSION_LOOP.is_running():
+            _SESSION_LOOP.run_until_complete(_SESSION.close())
+        else:
+            # The loop cannot run close(): the connector closes its pooled
+            # transports synchronously, which also marks the session closed
+            _SESSION.connector.close()
+    _SESSION, _SESSION_LOOP = None, None
+
+
+atexit.register(_discard_session)
+
+
+async def get_session() -> aiohttp.ClientSession:
+    """
+    Returns the session shared by the webhook helpers so that TCP/TLS
+    connections are kept alive between calls.
+
+    A new session is created when the previous one was closed or belongs
+    to another event loop (e.g. a prior asyncio.run()); the previous one
+    is closed first. Callers must `await close_session()` before their
+    event loop ends.
+    """
+    global _SESSION, _SESSION_LOOP
+    loop = asyncio.get_running_loop()
+    if _SESSION is not None and _SESSION_LOOP is not loop:
+        _discard_session()
+    if _SESSION is None or _SESSION.closed:
+        _SESSION = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(ssl=_SSL_CTX, limit=0, keepalive_timeout=75)
+        )
+        _SESSION_LOOP = loop
+    return _SESSION
+
+
+async def close_session() -> None:
+    """Closes the shared session, e.g. in the teardown of a test session"""
+    global _SESSION, _SESSION_LOOP
+    if _SESSION is not None and not _SESSION.closed:
+        await _SESSION.close()
+    _SESSION, _SESSION_LOOP = None, None
+
+
+async def _post_webhook(session: aiohttp.ClientSession, elm: Union[str, bytes]) -> None:
+    """Posts one serialized JSON message to the Flask server and logs the response"""
+    headers = {"content-type": "application/json"}
+    async with session.post(WEBSERVER, data=elm, headers=headers) as resp:
+        logger.debug("resp status:{}", resp.status)
+        # Reading the body lets aiohttp keep the connection; decode only for DEBUG
+        body = await resp.read()
+        logger.opt(lazy=True).debug(
+            "{}", lambda: body.decode(resp.get_encoding(), errors="replace")
+        )
+
+
+async def send_webhook(
+    json_list: List,
+    delay: float = 0.0,
+    session: Optional[aiohttp.ClientSession] = None,
+    concurrency: int = 16,
+) -> None:
     """
     Sends the list of JSON data to the Flask server.
 
+    Without a delay, up to `concurrency` requests are in flight at once.
+    With a delay, the messages are sent one by one in order, waiting
+    `delay` seconds after each response.
+
     Args:
         json_list (List[Dict]): A list of dictionaries containing JSON data.
         delay (float, optional): The amount of delay in seconds. Defaults to 0.0.
+        session (aiohttp.ClientSession, optional): The session to post with.
+            Defaults to the shared session from get_session().
+        concurrency (int, optional): The maximum number of concurrent requests
+            when there is no delay. Defaults to 16.
     """
-    # Create an SSL context with no certificate validation
-    ssl_context = ssl.SSLContext(ssl.PROTOCOL_TLS)
-    ssl_context.verify_mode = ssl.CERT_NONE
-
-    async with aiohttp.ClientSession(
-        connector=aiohttp.TCPConnector(ssl=ssl_context)
-    ) as session:
-        assert len(json_list) > 0, "No data for TV messages"
+    if session is None:
+        session = await get_session()
+    assert len(json_list) > 0, "No data for TV messages"
+    if delay > 0:
         for elm in json_list:
-            webhook_url = WEBSERVER
-            headers = {"content-type": "application/json"}
-            async with session.post(webhook_url, data=elm, headers=headers) as resp:
-                logger.debug(f"resp status:{resp.status}")
-                logger.debug(await resp.text())
+            await _post_webhook(session, elm)
             await asyncio.sleep(delay)
+        return
 
+    sem = asyncio.Semaphore(max(concurrency, 1))
 
-async def send_single_webhook(json_data: Dict, delay: float = 0.0) -> None:
+    async def bounded_post(elm: str) -> None:
+        async with sem:
+            await _post_webhook(session, elm)
+
+    await asyncio.gather(*(bounded_post(elm) for elm in json_list))
+
+
+async def send_single_webhook(
+    json_data: Dict,
+    delay: float = 0.0,
+    session: Optional[aiohttp.ClientSession] = None,
+) -> None:
     """
     Sends the JSON data to the Flask server.
 
     Args:
         json_data (Dict): A dictionary containing JSON data.
         delay (float, optional): The amount of delay in seconds. Defaults to 0.0.
+        session (aiohttp.ClientSession, optional): The session to post with.
+            Defaults to the shared session from get_session().
     """
-    # Create an SSL context with no certificate validation
-    ssl_context = ssl.SSLContext(ssl.PROTOCOL_TLS)
-    ssl_context.verify_mode = ssl.CERT_NONE
-
-    async with aiohttp.ClientSession(
-        connector=aiohttp.TCPConnector(ssl=ssl_context)
-    ) as session:
-        assert json_data, "No data for TV messages"
-        webhook_url = WEBSERVER
-        headers = {"content-type": "application/json"}
-        async with session.post(webhook_url, json=json_data, headers=headers) as resp:
-            logger.debug(f"resp status:{resp.status}")
-            logger.debug(await resp.text())
-        await asyncio.sleep(delay)
+    if session is None:
+        session = await get_session()
+    assert json_data, "No data for TV messages"
+    await _post_webhook(session, orjson.dumps(json_data))
+    await asyncio.sleep(delay)
 
 
 def update_tvmsg_data(
@@ -129,9 +226,7 @@ def update_tvmsg_data(
     Returns:
         Dict: The updated dictionary containing the TradingView message.
     """
-    data_dict[
-        "key"
-    ] = f'{TBOT_TVWB_EVENT}:{md5(f"{TBOT_TVWB_EVENT + UNIQUE_KEY}".encode()).hexdigest()[:6]}'
+    data_dict["key"] = TBOT_TVWB_EVENT_KEY
 
     # Overwrite clientId
     data_dict["clientId"] = CLIENT_ID
@@ -140,16 +235,11 @@ def update_tvmsg_data(
     if new_ord_ref:
         data_dict["orderRef"] = new_ord_ref
 
-    logger.debug(f'{data_dict["metrics"]}')
+    logger.debug("{}", data_dict["metrics"])
     for elm in data_dict["metrics"]:
-        if "entry_limit" in kwargs and elm.get("name") == "entry.limit":
-            elm["value"] = kwargs["entry_limit"]
-        if "entry_stop" in kwargs and elm.get("name") == "entry.stop":
-            elm["value"] = kwargs["entry_stop"]
-        if "exit_limit" in kwargs and elm.get("name") == "exit.limit":
-            elm["value"] = kwargs["exit_limit"]
-        if "exit_stop" in kwargs and elm.get("name") == "exit.stop":
-            elm["value"] = kwargs["exit_stop"]
+        kwarg = TBOT_METRIC_KWARGS.get(elm.get("name"))
+        if kwarg in kwargs:
+            elm["value"] = kwargs[kwarg]
 
     return data_dict
 
@@ -176,21 +266,52 @@ def update_tvmsg(
     """
     try:
         logger.debug(f"Opening {file_path}")
-        with open(file_path, "r", encoding="utf-8") as file:
-            data = json.loads(file.read())
+        with open(file_path, "rb") as file:
+            data = orjson.loads(file.read())
             data = update_tvmsg_data(data, timestamp, newordref, **kwargs)
-            ord_refex = get_ordref_ex(data["timeframe"], data["orderRef"])
+            ord_refex = cached_ordref_ex(data["timeframe"], data["orderRef"])
             key = OrderKey(data["ticker"], ord_refex)
-            logger.debug(f"Returning updated data: {json.dumps(data)}")
+            logger.opt(lazy=True).debug(
+                "Returning updated data: {}", lambda: json_dumps(data)
+            )
             return data, key
     except FileNotFoundError as err:
         logger.error(f"File not found: {file_path}, {err}")
         raise
-    except json.JSONDecodeError as err:
+    except orjson.JSONDecodeError as err:
         logger.error(f"Error decoding JSON from file {file_path}: {err}")
         raise
 
 
+def _load_tvmsg(
+    file_path: str,
+    timestamp: Optional[str] = None,
+    newordref: Optional[str] = None,
+) -> Optional[Tuple[OrderKey, str]]:
+    """
+    Loads and updates one TradingView message file.
+
+    Returns:
+        Tuple[OrderKey, str]: The database key and the message as a JSON string,
+        or None if the file cannot be read or decoded.
+    """
+    try:
+        logger.debug("opening {}", file_path)
+        with open(file_path, "rb") as file:
+            data = update_tvmsg_data(
+                data_dict=orjson.loads(file.read()),
+                new_timestamp=timestamp,
+                new_ord_ref=newordref,
+            )
+        ord_refex = cached_ordref_ex(data["timeframe"], data["orderRef"])
+        return OrderKey(data["ticker"], ord_refex), json_dumps(data)
+    except FileNotFoundError as err:
+        logger.error(f"File not found: {file_path}, {err}")
+    except orjson.JSONDecodeError as err:
+        logger.error(f"Error decoding JSON from file {file_path}: {err}")
+    return None
+
+
 def open_tvmsg(
     file_paths: List[str] = None,
     message_list: List[str] = None,
@@ -200,6 +321,7 @@ def open_tvmsg(
     """
     Opens files and loads TradingView messages into `message_list`,
     updating the message if necessary.
+    Several files are read on a thread pool; the order of file_paths is kept.
 
     Args:
         file_paths (List[str], optional): A list of file paths to open.
@@ -220,25 +342,24 @@ def open_tvmsg(
         file_paths = []  # create a new empty list
     if message_list is None:
         message_list = []  # create a new empty list
+
+    def load(file_path: str) -> Optional[Tuple[OrderKey, str]]:
+        return _load_tvmsg(file_path, timestamp, newordref)
+
+    if len(file_paths) > 1:
+        with ThreadPoolExecutor(max_workers=min(len(file_paths), 8)) as pool:
+            loaded = list(pool.map(load, file_paths))
+    else:
+        loaded = [load(file_path) for file_path in file_paths]
+
     rval = []
-    for file_path in file_paths:
-        try:
-            logger.debug(f"opening {file_path}")
-            with open(file_path, "r", encoding="utf-8") as file:
-                data = update_tvmsg_data(
-                    data_dict=json.loads(file.read()),
-                    new_timestamp=timestamp,
-                    new_ord_ref=newordref,
-                )
-                ord_refex = get_ordref_ex(data["timeframe"], data["orderRef"])
-                key = OrderKey(data["ticker"], ord_refex)
-                logger.debug(f"appending {key}")
-                rval.append(key)
-                message_list.append(json.dumps(data))
-        except FileNotFoundError as err:
-            logger.error(f"File not found: {file_path}, {err}")
-        except json.JSONDecodeError as err:
-            logger.error(f"Error decoding JSON from file {file_path}: {err}")
+    for elm in loaded:
+        if elm is None:
+            continue
+        key, msg = elm
+        logger.debug("appending {}", key)
+        rval.append(key)
+        message_list.append(msg)
     assert rval, f"No files given for open_tvmsg len={len(rval)}"
     return rval
 
@@ -8,6 +8,14 @@ __author__ = "Sangwook Lee"
 __copyright__ = "Copyright (C) 2023 Plusgenie Ltd"
 __license__ = "Dual-Licensing (GPL or Commercial License)"
 
+import time
+
+import orjson
+
+_TRUE_VALUES = frozenset(("y", "yes", "t", "true", "on", "1"))
+_FALSE_VALUES = frozenset(("n", "no", "f", "false", "off", "0"))
+
+
 # strtobool was copied from https://github.com/python/cpython/blob/3.10/Lib/distutils/util.py#L308
 # under the license of https://github.com/python/cpython/blob/main/LICENSE
 
@@ -26,9 +34,22 @@ def strtobool(val):
         int: A boolean value represented as an integer (0 or 1)
     """
     val = val.lower()
-    if val in ('y', 'yes', 't', 'true', 'on', '1'):
+    if val in _TRUE_VALUES:
         return 1
-    elif val in ('n', 'no', 'f', 'false', 'off', '0'):
+    elif val in _FALSE_VALUES:
         return 0
     else:
         raise ValueError(f"invalid truth value: {val}")
+
+
+def json_dumps(obj) -> str:
+    """
+    Serializes obj with orjson and returns str instead of bytes,
+    as Discord embeds and Telegram messages expect text.
+    """
+    return orjson.dumps(obj).decode("utf-8")
+
+
+def now_ms() -> int:
+    """Returns the wall-clock time in milliseconds as used by the unique keys"""
+    return time.time_ns() // 1_000_000
@@ -10,12 +10,13 @@ __license__ = "Dual-Licensing (GPL or Commercial License)"
 
 from dataclasses import dataclass
 from typing import Dict
-import random
+import time
 import redis
 from loguru import logger
 
 from tbot_tradingboat.pg_decoder.tbot_observer import TbotObserver
 from tbot_tradingboat.utils.tbot_env import shared
+from tbot_tradingboat.utils.constants import TBOT_WATCHDOG_PING_SEC
 
 
 @dataclass
@@ -24,37 +25,50 @@ class WatchObserver(TbotObserver):
     Implement WatchDog for TBOT
     """
 
-    def is_redis_alive(self) -> bool:
-        """
-        Checks if redis's connection is alive
-        """
-        is_connected: bool = False
-        try:
+    def _redis_client(self) -> redis.Redis:
+        """Returns the Redis client of the watchdog, creating it on first use"""
+        if self._con is None:
             if shared.r_host:
                 logger.trace(f"trying to connect {shared.r_host}:{shared.r_port}")
-                con = redis.Redis(
+                self._con = redis.Redis(
                     host=shared.r_host,
                     port=int(shared.r_port),
                     password=shared.r_passwd,
                 )
-                is_connected = con.ping()
-                logger.trace(f"get a ping resp = {is_connected}")
             else:
                 logger.trace(f"trying to connect {shared.r_host_unix}")
-                con = redis.Redis(
+                self._con = redis.Redis(
                     unix_socket_path=shared.r_host_unix, password=shared.r_passwd
                 )
-                is_connected = con.ping()
-                logger.trace(f"get a ping resp = {is_connected}")
+        return self._con
+
+    def _drop_redis_client(self):
+        """Closes the Redis client so that the next ping reconnects"""
+        if self._con is not None:
+            self._con.close()
+            self._con = None
+
+    def is_redis_alive(self) -> bool:
+        """
+        Checks if redis's connection is alive
+        """
+        is_connected: bool = False
+        try:
+            is_connected = self._redis_client().ping()
+            logger.trace(f"get a ping resp = {is_connected}")
         except redis.ConnectionError as err:
             logger.error(f"Redis connection error {err}")
+            self._drop_redis_client()
             is_connected = False
         except BaseException as err:
             logger.error(f"{err}")
         return is_connected
 
     def open(self):
-        pass
+        # Monotonic deadline of the next Redis ping
+        self._next_ping = 0.0
+        # Reused across pings
+        self._con = None
 
     def update(
         self,
@@ -70,10 +84,14 @@ class WatchObserver(TbotObserver):
             data_dict (List, optional): New data. Defaults to None.
         """
         # Watchdog will do its work if there is no data
-        # ping around every 30 minutes
-        if not data_dict and random.uniform(0, 360000) <= 2:
+        # ping every TBOT_WATCHDOG_PING_SEC (30 minutes)
+        if data_dict:
+            return
+        now = time.monotonic()
+        if now >= self._next_ping:
+            self._next_ping = now + TBOT_WATCHDOG_PING_SEC
             if not self.is_redis_alive():
                 logger.error("Failed to connect to Redis")
 
     def close(self):
-        pass
+        self._drop_redis_client()
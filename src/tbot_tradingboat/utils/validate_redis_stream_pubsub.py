@@ -10,9 +10,12 @@ Plusgenie(c) 2023 All rights reserved.
 """
 
 
-import json
 import os
 import sys
+from types import SimpleNamespace
+from typing import Iterable, List
+
+import orjson
 from redis import Redis
 from dotenv import load_dotenv
 
@@ -35,6 +38,14 @@ else:
 # Load the environment variables from the chosen .env file
 load_dotenv(dotenv_path=ENV_FILE_PATH, override=True)
 
+# Redis settings shared by the publisher and the subscriber, read once
+REDIS_CONFIG = SimpleNamespace(
+    stream_key=os.getenv("REDIS_STREAM_KEY", "REDIS_SKEY_1"),
+    tb_key=os.getenv("REDIS_STREAM_TB_KEY", "tradingboat"),
+    sock=os.getenv("TBOT_REDIS_UNIXDOMAIN_SOCK", "/var/run/redis/redis-server.sock"),
+    channel=os.getenv("REDIS_CHANNEL", "REDIS_CH_99"),
+)
+
 
 TV_WEBHOOK = {
     "timestamp": 1670712860260,
@@ -64,14 +75,11 @@ class RedisStreamPub:
 
     def connect_to_redis_stream_unix_domain(self):
         # Creating the Publisher
-        self.redis_stream_key = os.getenv("REDIS_STREAM_KEY", "REDIS_SKEY_1")
-        self.redis_stream_tb_key = os.getenv("REDIS_STREAM_TB_KEY", "tradingboat")
-        hostname = os.getenv(
-            "TBOT_REDIS_UNIXDOMAIN_SOCK", "/var/run/redis/redis-server.sock"
-        )
-        self.redis_channel = os.getenv("REDIS_CHANNEL", "REDIS_CH_99")
+        self.redis_stream_key = REDIS_CONFIG.stream_key
+        self.redis_stream_tb_key = REDIS_CONFIG.tb_key
+        self.redis_channel = REDIS_CONFIG.channel
         self.redis_conn = Redis(
-            unix_socket_path=hostname,
+            unix_socket_path=REDIS_CONFIG.sock,
             # decode_responses=True,
             db=0,
         )
@@ -82,13 +90,28 @@ class RedisStreamPub:
         stream_id = "0-0"
         if data_dict:
             # Create a bespoken dictionary for Redis Stream
-            stream_dict = {self.redis_stream_tb_key: json.dumps(data_dict)}
+            stream_dict = {self.redis_stream_tb_key: orjson.dumps(data_dict)}
             stream_id = self.redis_conn.xadd(self.redis_stream_key, stream_dict)
             logger.debug(
                 f"---> pushed to redis, {self.redis_stream_key}:{self.redis_stream_tb_key}"
             )
         return stream_id
 
+    def add_many(self, data_list: Iterable[dict]) -> List:
+        """Add several messages to the stream in one round trip"""
+        pipe = self.redis_conn.pipeline(transaction=False)
+        for data_dict in data_list:
+            pipe.xadd(
+                self.redis_stream_key,
+                {self.redis_stream_tb_key: orjson.dumps(data_dict)},
+            )
+        stream_ids = pipe.execute()
+        logger.debug(
+            f"---> pushed {len(stream_ids)} to redis, "
+            f"{self.redis_stream_key}:{self.redis_stream_tb_key}"
+        )
+        return stream_ids
+
 
 class RedisStreamSub:
     """Redis Sub"""
@@ -99,19 +122,16 @@ class RedisStreamSub:
 
     def connect_to_redis_stream_unix_domain(self):
         logger.info("consumer: connecting")
-        self.redis_stream_key = os.getenv("REDIS_STREAM_KEY", "REDIS_SKEY_1")
-        self.redis_stream_tb_key = os.getenv("REDIS_STREAM_TB_KEY", "tradingboat")
-        hostname = os.getenv(
-            "TBOT_REDIS_UNIXDOMAIN_SOCK", "/var/run/redis/redis-server.sock"
-        )
-        self.redis_channel = os.getenv("REDIS_CHANNEL", "REDIS_CH_99")
+        self.redis_stream_key = REDIS_CONFIG.stream_key
+        self.redis_stream_tb_key = REDIS_CONFIG.tb_key
+        self.redis_channel = REDIS_CONFIG.channel
         self.redis_conn = Redis(
-            unix_socket_path=hostname,
+            unix_socket_path=REDIS_CONFIG.sock,
             # decode_responses=True,
             db=0,
         )
 
-    def read_redis_stream(self):
+    def read_redis_stream(self) -> bytes:
         """
         Suppposed that the earlist stream ID is 1670792643625-0'
         stream_id, count, block = ('$', None, 0) -> not work
@@ -124,10 +144,10 @@ class RedisStreamSub:
         logger.info(f"Consumer: input stream_id {stream_id}")
         r_data = self.redis_conn.xread({self.redis_stream_key: stream_id}, count, block)
         if r_data:
-            first_stream = r_data[0]
-            fs_data_arr = first_stream[1]
-            (stream_id, _value) = fs_data_arr[0]
-            logger.info(f"first_stream:{first_stream}, stream_id:{stream_id}")
+            # Only the id is used; the payload stays as the raw bytes from Redis
+            stream_id = r_data[0][1][0][0]
+            logger.info("Consumer: read stream_id {}", stream_id)
+        return stream_id
 
 
 if __name__ == "__main__":
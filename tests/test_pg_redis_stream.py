@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""
+TradingBoat © Copyright, Plusgenie Limited 2023. All Rights Reserved.
+
+Delivery of Redis Stream entries across reconnects and duplicated timestamps
+"""
+import orjson
+import pytest
+
+from tbot_tradingboat.pg_redis import stream as tbot_stream
+
+
+class FakeRedis:
+    """Minimal Redis Stream with XREAD cursor/count semantics and XDEL"""
+
+    def __init__(self, entries):
+        self.entries = dict(entries)
+
+    @staticmethod
+    def _seq(id_b):
+        ms_part, _, seq_part = id_b.partition(b"-")
+        return int(ms_part), int(seq_part)
+
+    def xread(self, streams, count=None, block=None):
+        (key, cursor), = streams.items()
+        start = (0, 0) if cursor in (0, "0") else self._seq(cursor)
+        ids = sorted((i for i in self.entries if self._seq(i) > start), key=self._seq)
+        ids = ids[:count]
+        if not ids:
+            return []
+        return [[key, [(i, self.entries[i]) for i in ids]]]
+
+    def xdel(self, key, *ids):
+        return sum(1 for i in ids if self.entries.pop(i, None) is not None)
+
+    def ping(self):
+        return True
+
+
+def _entry(ts):
+    payload = orjson.dumps({"timestamp": ts, "ticker": "AAPL"})
+    return {b"tradingboat": payload}
+
+
+@pytest.fixture
+def make_stream(monkeypatch):
+    def factory(entries):
+        fake = FakeRedis(entries)
+        monkeypatch.setattr(tbot_stream.redis, "ConnectionPool", lambda **kw: None)
+        monkeypatch.setattr(tbot_stream.redis, "Redis", lambda **kw: fake)
+        sub = tbot_stream.TbotStream()
+        sub.validts.duplicated_ts = True
+        monkeypatch.setattr(sub.validts, "is_valid_json_schema", lambda data: True)
+        sub.connect()
+        return sub, fake
+
+    return factory
+
+
+def _drain(sub, delivered):
+    while True:
+        _, data, msg_id = sub.handle_event(None)
+        if msg_id is None:
+            return
+        delivered.append(data["timestamp"])
+        sub.delete(msg_id)
+
+
+def test_reconnect_with_half_drained_batch(make_stream):
+    entries = {f"100{n}-0".encode(): _entry(n) for n in range(1, 5)}
+    sub, fake = make_stream(entries)
+    delivered = []
+    # Consume the first entry, hand out the second without deleting it
+    _, data, msg_id = sub.handle_event(None)
+    delivered.append(data["timestamp"])
+    sub.delete(msg_id)
+    _, data, _ = sub.handle_event(None)
+    assert data["timestamp"] == 2
+    # The connection drops with the rest of the batch still pending
+    sub.connect()
+    _drain(sub, delivered)
+    assert delivered == [1, 2, 3, 4]
+    assert not fake.entries
+
+
+def test_unacked_entry_is_rescanned(make_stream):
+    sub, fake = make_stream({b"1001-0": _entry(1), b"1002-0": _entry(2)})
+    # An observer keeps the first entry (e.g. IB is disconnected)
+    _, data, _ = sub.handle_event(None)
+    assert data["timestamp"] == 1
+    delivered = []
+    # Once the batch is drained, the kept entry is read again from "0"
+    _drain(sub, delivered)
+    assert delivered == [2, 1]
+    assert not fake.entries
+
+
+def test_replayed_timestamp_is_dropped(make_stream):
+    sub, fake = make_stream({b"1001-0": _entry(1), b"1002-0": _entry(1)})
+    delivered = []
+    _drain(sub, delivered)
+    assert delivered == [1]
+    assert not fake.entries